@@ -0,0 +1,117 @@
+"""
+Admission control для CPU-важких ендпоінтів
+-------------------------------------------
+Кожен клас маршрутів (photo / voice / video / pdf) має ліміт одночасних задач
+і обмежену чергу очікування. Коли черга повна (або очікування довше
+max_wait), запит одразу отримує 429 з Retry-After, а не висить до таймауту —
+сервіс деградує поступово, а дешеві ендпоінти лишаються доступними.
+
+Ліміти задаються змінною оточення, формат "клас=паралельність/черга":
+    ADMISSION_LIMITS="photo=2/8,voice=4/16,video=1/4,pdf=1/4,export=2/2"
+"""
+
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Tuple
+
+from fastapi import HTTPException
+
+_CPUS = os.cpu_count() or 1
+
+DEFAULT_LIMITS: Dict[str, Tuple[int, int]] = {
+    "photo": (_CPUS, _CPUS * 4),
+    "voice": (_CPUS * 2, _CPUS * 8),
+    "pdf": (max(1, _CPUS // 2), _CPUS * 2),
+    # кожна задача — окремий процес ffmpeg (1 потік декодування) + метрики кадрів
+    "video": (max(1, _CPUS // 2), _CPUS * 2),
+    # довгі потокові вивантаження — обмежуємо, щоб не з'їли диск і потоки
+    "export": (2, 2),
+}
+MAX_WAIT_SEC = float(os.getenv("ADMISSION_MAX_WAIT", "10"))
+
+
+class AdmissionGate:
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float = MAX_WAIT_SEC):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._sem = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.completed = 0
+        # EWMA тривалості задачі — для оцінки Retry-After
+        self.avg_sec = 1.0
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.avg_sec * (self.waiting + 1) / self.limit))
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many {self.name} requests ({reason}), retry later",
+            headers={"Retry-After": str(self.retry_after()), "X-Queue-Depth": str(self.waiting)},
+        )
+
+    def check(self):
+        """429 одразу, якщо слотів немає і черга повна."""
+        if self._sem.locked() and self.waiting >= self.max_queue:
+            self._reject("queue full")
+
+    @asynccontextmanager
+    async def slot(self):
+        self.check()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            timed_out = True
+        else:
+            timed_out = False
+        finally:
+            # і при скасуванні (клієнт відключився) — інакше черга "забивається" назавжди
+            self.waiting -= 1
+        if timed_out:
+            self._reject("queue timeout")
+
+        self.active += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._sem.release()
+            self.completed += 1
+            self.avg_sec = 0.8 * self.avg_sec + 0.2 * (time.perf_counter() - started)
+
+    def stats(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "avg_ms": round(self.avg_sec * 1000, 1),
+        }
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    limits = dict(DEFAULT_LIMITS)
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, value = part.partition("=")
+        conc, _, queue = value.partition("/")
+        limits[name.strip()] = (max(1, int(conc)), max(0, int(queue or 0)))
+    return limits
+
+
+def build_gates(spec: str = "") -> Dict[str, AdmissionGate]:
+    return {
+        name: AdmissionGate(name, conc, queue)
+        for name, (conc, queue) in parse_limits(spec or os.getenv("ADMISSION_LIMITS", "")).items()
+    }
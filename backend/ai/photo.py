@@ -1,19 +1,25 @@
-from typing import Dict
+from typing import BinaryIO, Dict, Union
 import io
 import math
-from PIL import Image, ImageStat
 
 
-def analyze_photo_bytes(raw: bytes) -> Dict:
-    img = Image.open(io.BytesIO(raw)).convert("L")
+def analyze_photo_bytes(raw: Union[bytes, memoryview, BinaryIO]) -> Dict:
+    # PIL імпортується при першому аналізі, а не при старті воркера
+    from PIL import Image, ImageStat
+
+    # файл (напр. SpooledTemporaryFile завантаження) декодуємо напряму, без копії в bytes
+    fp = raw if hasattr(raw, "read") else io.BytesIO(raw)
+    img = Image.open(fp).convert("L")
     stat = ImageStat.Stat(img)
     mean = stat.mean[0]
     variance = stat.var[0]
     std = math.sqrt(variance)
 
-    brightness = mean
-    contrast = std
+    return photo_metrics(mean, std)
+
 
+def photo_metrics(brightness: float, contrast: float) -> Dict:
+    """Інтерпретація яскравості / контрасту (0–255) у настрій та рівень втоми."""
     if brightness > 180 and contrast > 40:
         mood = "енергійний / активний"
     elif brightness < 80 and contrast < 30:
@@ -0,0 +1,168 @@
+from typing import BinaryIO, Dict, Iterator, List, Union
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from ai.photo import photo_metrics
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+# кадри зменшуються до FRAME_W x FRAME_H у сірому (1 байт на піксель):
+# для яскравості / контрасту пропорції не важливі, а розмір кадру фіксований
+FRAME_W = 160
+FRAME_H = 120
+DEFAULT_FPS = float(os.getenv("VIDEO_FPS", "1"))
+MIN_FPS, MAX_FPS = 0.1, 5.0
+MAX_FRAMES = int(os.getenv("VIDEO_MAX_FRAMES", "120"))
+TIMEOUT_SEC = float(os.getenv("VIDEO_TIMEOUT_SEC", "60"))
+# з stderr ffmpeg-а для повідомлення про помилку потрібен лише хвіст
+STDERR_TAIL_BYTES = 4096
+
+FATIGUE_LEVELS = ("низький", "середній", "високий")
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which(FFMPEG_BIN) is not None
+
+
+def clamp_fps(fps: float) -> float:
+    return min(max(fps, MIN_FPS), MAX_FPS)
+
+
+def _frame_stats(frame: bytes):
+    """Середнє та std сирого сірого кадру — так само, як analyze_photo_bytes."""
+    from PIL import Image, ImageStat
+
+    stat = ImageStat.Stat(Image.frombytes("L", (FRAME_W, FRAME_H), frame))
+    return stat.mean[0], math.sqrt(stat.var[0])
+
+
+def _has_fileno(raw) -> bool:
+    try:
+        raw.fileno()
+    except (AttributeError, OSError, ValueError):
+        return False
+    return True
+
+
+def _drain(stream, tail: bytearray, keep: int = STDERR_TAIL_BYTES):
+    """Читає stream до EOF, зберігаючи лише останні keep байтів."""
+    for chunk in iter(lambda: stream.read(4096), b""):
+        tail += chunk
+        del tail[:-keep]
+
+
+def iter_frames(raw: Union[bytes, memoryview, BinaryIO], fps: float, max_frames: int = MAX_FRAMES) -> Iterator[bytes]:
+    """
+    Декодує відео ffmpeg-ом і віддає сірі кадри FRAME_W x FRAME_H по одному.
+
+    Кадри йдуть через stdout-pipe і на диск не пишуться; у пам'яті — лише поточний кадр.
+    Файл завантаження (SpooledTemporaryFile) передається ffmpeg-у як stdin
+    і відкривається через /dev/stdin, а не pipe:0 — так контейнери з індексом
+    у кінці (mp4 без faststart) теж читаються, бо вхід лишається seekable.
+    """
+    if hasattr(raw, "rollover"):
+        # дрібне завантаження ще в пам'яті — скидаємо на диск, щоб мати fd
+        raw.rollover()
+    elif not _has_fileno(raw):
+        # bytes / BytesIO: сам відеофайл (не кадри) копіюється в тимчасовий файл
+        with tempfile.TemporaryFile() as fp:
+            if hasattr(raw, "read"):
+                raw.seek(0)
+                shutil.copyfileobj(raw, fp)
+            else:
+                fp.write(raw)
+            yield from iter_frames(fp, fps, max_frames)
+        return
+    raw.seek(0)
+
+    cmd = [
+        FFMPEG_BIN, "-nostdin", "-hide_banner", "-loglevel", "error",
+        # один потік декодування на задачу — паралельність обмежує admission
+        "-threads", "1",
+        "-i", "/dev/stdin",
+        "-an", "-sn", "-dn",
+        "-vf", f"fps={fps},scale={FRAME_W}:{FRAME_H},format=gray",
+        "-frames:v", str(max_frames),
+        "-f", "rawvideo", "-pix_fmt", "gray", "pipe:1",
+    ]
+    proc = subprocess.Popen(cmd, stdin=raw, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # stderr читається паралельно: інакше ~64 КБ помилок заповнять pipe і ffmpeg зависне
+    err_tail = bytearray()
+    drain = threading.Thread(target=_drain, args=(proc.stderr, err_tail), daemon=True)
+    drain.start()
+    timed_out = threading.Event()
+
+    def _kill():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(TIMEOUT_SEC, _kill)
+    timer.start()
+
+    frame_size = FRAME_W * FRAME_H
+    frames = 0
+    try:
+        while frames < max_frames:
+            frame = proc.stdout.read(frame_size)
+            if len(frame) < frame_size:
+                break
+            frames += 1
+            yield frame
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None and frames >= max_frames:
+            proc.kill()
+        code = proc.wait()
+        timer.cancel()
+        drain.join()
+        proc.stderr.close()
+        err = err_tail.decode("utf-8", "replace").strip()
+
+    # обрізаний таймлайн — не результат (і не повинен потрапити в кеш)
+    if timed_out.is_set():
+        raise TimeoutError(f"Video decoding timed out after {TIMEOUT_SEC:g}s")
+    if not frames:
+        raise ValueError(f"Cannot decode video: {err[-300:] or f'ffmpeg exit code {code}'}")
+
+
+def analyze_video_bytes(
+    raw: Union[bytes, memoryview, BinaryIO],
+    fps: float = DEFAULT_FPS,
+    max_frames: int = MAX_FRAMES,
+) -> Dict:
+    """
+    Аналіз короткого відео: кадри з частотою fps проходять через ті ж
+    метрики, що й фото (photo_metrics). Повертає таймлайн по кадрах та агрегат.
+    """
+    fps = clamp_fps(fps)
+    timeline: List[Dict] = []
+    fatigue_counts = dict.fromkeys(FATIGUE_LEVELS, 0)
+    brightness_sum = contrast_sum = 0.0
+
+    for i, frame in enumerate(iter_frames(raw, fps, max_frames)):
+        brightness, contrast = _frame_stats(frame)
+        metrics = photo_metrics(brightness, contrast)
+        timeline.append({
+            "t": round(i / fps, 2),
+            "brightness": metrics["brightness"],
+            "contrast": metrics["contrast"],
+            "fatigue_level": metrics["fatigue_level"],
+        })
+        fatigue_counts[metrics["fatigue_level"]] += 1
+        brightness_sum += brightness
+        contrast_sum += contrast
+
+    n = len(timeline)
+    aggregate = photo_metrics(brightness_sum / n, contrast_sum / n)
+    aggregate.update({
+        "source": "video",
+        "fps": fps,
+        "frames": n,
+        "duration_sec": round(n / fps, 2),
+        "fatigue_share": {k: round(v / n, 3) for k, v in fatigue_counts.items()},
+        "timeline": timeline,
+    })
+    return aggregate
@@ -1,8 +1,18 @@
-from typing import Dict, Optional
+from typing import BinaryIO, Dict, Optional, Union
 import math
+import os
 
 
-def analyze_voice_bytes(raw: bytes, content_hint: Optional[str] = None) -> Dict:
+def _payload_size(raw: Union[bytes, memoryview, BinaryIO]) -> int:
+    if hasattr(raw, "seek"):
+        pos = raw.tell()
+        size = raw.seek(0, os.SEEK_END)
+        raw.seek(pos)
+        return size
+    return len(raw)
+
+
+def analyze_voice_bytes(raw: Union[bytes, memoryview, BinaryIO], content_hint: Optional[str] = None) -> Dict:
     """
     Дуже спрощений аналіз голосу без зовнішніх бібліотек.
     Працює на будь-якому Python (в т.ч. 3.13) і не використовує pydub/ffmpeg.
@@ -10,9 +20,12 @@ def analyze_voice_bytes(raw: bytes, content_hint: Optional[str] = None) -> Dict:
     Ми не аналізуємо реальний спектр, а оцінюємо:
       - тривалість (приблизно)
       - "інтенсивність" за розміром файлу
+
+    raw може бути bytes / memoryview або файлом (читається лише розмір).
     """
 
-    if not raw:
+    size = _payload_size(raw)
+    if not size:
         return {
             "duration_sec": 0.0,
             "avg_energy": 0.0,
@@ -23,12 +36,12 @@ def analyze_voice_bytes(raw: bytes, content_hint: Optional[str] = None) -> Dict:
 
     # груба оцінка тривалості за розміром (в байтах)
     # 16 кб/сек → 16000 байт ~ 1 сек
-    approx_duration = max(len(raw) / 16000.0, 0.3)
+    approx_duration = max(size / 16000.0, 0.3)
     if approx_duration > 120:
         approx_duration = 120.0
 
     # "енергія" = логарифм розміру
-    size_kb = len(raw) / 1024.0
+    size_kb = size / 1024.0
     avg_energy = math.log10(1.0 + size_kb) * 100.0
 
     # варіація умовна — фіксована частка
@@ -0,0 +1,137 @@
+"""
+Кеш результатів фото- та голосового аналізу за хешем вмісту
+-----------------------------------------------------------
+Telegram-користувачі часто надсилають те саме фото / голосове повторно,
+а бот ретраїть завантаження на таймаутах. Результат аналізу детермінований
+від байтів файлу, тому зберігаємо його за sha256:
+
++ гарячий шар — обмежений LRU у пам'яті воркера (окремий екземпляр на шард tenant-а)
++ холодний шар — таблиця analysis_cache у SQLite (спільна для всіх воркерів)
+"""
+
+import datetime
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Збільшити, якщо змінюється логіка ai.photo / ai.voice — старі записи стануть промахами.
+ANALYZER_VERSION = 1
+# last_used_at потрібен лише для витіснення — достатньо оновлювати його зрідка
+TOUCH_INTERVAL = datetime.timedelta(hours=1)
+
+Statement = Tuple[str, Sequence[Any]]
+
+
+class AnalysisCache:
+    def __init__(
+        self,
+        conn_factory: Callable[[], Any],
+        maxsize: int = 1024,
+        max_rows: int = 100_000,
+        prune_every: int = 500,
+    ):
+        self._conn_factory = conn_factory
+        self._maxsize = maxsize
+        self._max_rows = max_rows
+        self._prune_every = prune_every
+        # key -> (результат, last_used_at)
+        self._lru: "OrderedDict[str, Tuple[Dict, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(kind: str, digest: str) -> str:
+        return f"{kind}:v{ANALYZER_VERSION}:{digest}"
+
+    def _remember(self, key: str, result: Dict, used_at: str):
+        with self._lock:
+            self._lru[key] = (result, used_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self._maxsize:
+                self._lru.popitem(last=False)
+
+    def get(self, kind: str, digest: str) -> Optional[Dict]:
+        """Лише читання (блокує — викликати з threadpool); last_used_at оновлює touch()."""
+        key = self._key(kind, digest)
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return dict(entry[0])
+
+        conn = self._conn_factory()
+        try:
+            row = conn.execute(
+                "SELECT result_json, last_used_at FROM analysis_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if not row:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        result = json.loads(row[0])
+        self._remember(key, result, row[1] or "")
+        with self._lock:
+            self.hits += 1
+        return dict(result)
+
+    def touch(self, kind: str, digest: str) -> List[Statement]:
+        """UPDATE last_used_at для влучання — не частіше за TOUCH_INTERVAL на ключ.
+
+        Повертає statements, які виклик додає в ту саму транзакцію, що й рядок
+        результату (run_write), — окремого коміту на кожне влучання немає.
+        """
+        key = self._key(kind, digest)
+        now = datetime.datetime.utcnow()
+        stale_before = (now - TOUCH_INTERVAL).isoformat()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is None or entry[1] >= stale_before:
+                return []
+            self._lru[key] = (entry[0], now.isoformat())
+        return [("UPDATE analysis_cache SET last_used_at = ? WHERE cache_key = ?", (now.isoformat(), key))]
+
+    def put(self, kind: str, digest: str, result: Dict) -> List[Statement]:
+        """Кладе результат у LRU і повертає statements для рядка analysis_cache.
+
+        Окремого коміту немає: виклик пише їх тим самим run_write, що й рядок
+        результату, — в одній транзакції (і в одній пачці group-commit writer-а).
+        """
+        key = self._key(kind, digest)
+        now = datetime.datetime.utcnow().isoformat()
+        self._remember(key, dict(result), now)
+
+        statements: List[Statement] = [(
+            """
+            INSERT OR REPLACE INTO analysis_cache (cache_key, kind, result_json, created_at, last_used_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (key, kind, json.dumps(result, ensure_ascii=False), now, now),
+        )]
+        with self._lock:
+            self._puts += 1
+            prune = self._puts % self._prune_every == 0
+        if prune:
+            # тримаємо таблицю обмеженою: викидаємо найдавніше використані
+            statements.append((
+                """
+                DELETE FROM analysis_cache WHERE cache_key IN (
+                    SELECT cache_key FROM analysis_cache
+                    ORDER BY last_used_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self._max_rows,),
+            ))
+        return statements
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._lru), "hits": self.hits, "misses": self.misses}
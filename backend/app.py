@@ -9,28 +9,69 @@ AI HR Psychologist - Multi-tests Backend (PLUS)
 + Простий білінг (free / pro_demo + demo_until)
 """
 
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
 import io
 import os
+import asyncio
 import json
 import datetime
+import queue
+import threading
+from contextlib import AsyncExitStack, asynccontextmanager
 from statistics import mean
 import sqlite3
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Sequence, Tuple
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header, Query
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from ai.voice import analyze_voice_bytes
-from ai.photo import analyze_photo_bytes
-from ai.reports import build_pdf_report
+from startup_report import rss_kb
+from analysis_cache import AnalysisCache
+from uploads import UploadLimitMiddleware, spool_upload
+from db_writer import GroupCommitWriter
+from archive import RESULT_TABLES, attach_archives
+from shards import ShardRouter, TenantMiddleware, current_tenant
+from events import EventBus
+from admission import build_gates
+import overview
+from export import EXPORT_KINDS, export_sources, iter_export
+
+# Аналізатори (PIL, ReportLab) імпортуються в ендпоінтах при першому виклику,
+# щоб холодний старт і пам'ять воркера не платили за них наперед.
 
 DB_PATH = Path(__file__).resolve().parent / "hrpsy_multi_plus.db"
 ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "DEV_ADMIN_KEY")
+# Реєстр tenant-ів та каталог їхніх шардів (див. shards.py)
+TENANTS_DB_PATH = Path(os.getenv("TENANTS_DB_PATH", str(DB_PATH.parent / "tenants.db")))
+SHARDS_DIR = Path(os.getenv("SHARDS_DIR", str(DB_PATH.parent / "shards")))
+# Збільшувати при кожній зміні схеми в init_db()
+SCHEMA_VERSION = 6
+# Write-behind: вставки результатів комітяться пачками одним потоком-писачем
+WRITE_BEHIND = os.getenv("HRPSY_WRITE_BEHIND", "0") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    ensure_db(DB_PATH)
+    print(
+        f"[startup] import {(started - _IMPORT_STARTED) * 1000:.0f} ms, "
+        f"init {(time.perf_counter() - started) * 1000:.0f} ms, rss {rss_kb() / 1024:.1f} MB"
+    )
+    yield
+    for writer in list(_writers.values()):
+        writer.stop()
+    shard_router.close_all()
 
-app = FastAPI(title="AI HR Psychologist Backend (PLUS)", version="1.0")
+
+app = FastAPI(title="AI HR Psychologist Backend (PLUS)", version="1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -40,9 +81,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    UploadLimitMiddleware,
+    routes={"/api/voice/analyze": "voice", "/api/photo/analyze": "photo", "/api/video/analyze": "video"},
+)
+
 
 def check_admin(api_key: Optional[str]):
-    if api_key is None or api_key != ADMIN_API_KEY:
+    if shard_router.tenant_for_key(api_key) is None:
         raise HTTPException(status_code=401, detail="Unauthorized (invalid X-Admin-Key)")
 
 
@@ -103,14 +149,26 @@ def list_tests_meta() -> List[Dict[str, Any]]:
     return out
 
 
-def get_conn():
-    return sqlite3.connect(DB_PATH)
+def get_conn(db_path: Optional[Path] = None):
+    """Без db_path — з'єднання з пулу шарду поточного tenant-а."""
+    if db_path is not None:
+        return sqlite3.connect(db_path)
+    return shard_router.connect()
 
 
-def init_db():
-    conn = get_conn()
+def _ensure_column(c, table: str, column: str, decl: str):
+    c.execute(f"PRAGMA table_info({table})")
+    if column not in [r[1] for r in c.fetchall()]:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def init_db(db_path: Optional[Path] = None):
+    conn = get_conn(db_path)
     c = conn.cursor()
 
+    # діє лише для нового (порожнього) файлу; існуючі переводить archive.py
+    c.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
     c.execute(
         """
         CREATE TABLE IF NOT EXISTS candidates (
@@ -187,6 +245,60 @@ def init_db():
         """
     )
 
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            cache_key TEXT PRIMARY KEY,
+            kind TEXT,
+            result_json TEXT,
+            created_at TEXT,
+            last_used_at TEXT
+        )
+        """
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_used ON analysis_cache (last_used_at)")
+
+    # sha256 завантаженого файлу — посилання на запис analysis_cache
+    _ensure_column(c, "voice_results", "content_hash", "TEXT")
+    _ensure_column(c, "photo_results", "content_hash", "TEXT")
+    # для відео (/api/video/analyze): таймлайн по кадрах; у фото — NULL
+    _ensure_column(c, "photo_results", "details_json", "TEXT")
+
+    # start_test робить upsert по tg_id; дублікати зі старих версій зливає merge_candidates.py
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS candidate_merges (
+            old_id INTEGER PRIMARY KEY,
+            new_id INTEGER,
+            merged_at TEXT
+        )
+        """
+    )
+    try:
+        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_candidates_tg_id ON candidates (tg_id)")
+    except sqlite3.IntegrityError:
+        c.execute("CREATE INDEX IF NOT EXISTS idx_candidates_tg_id ON candidates (tg_id)")
+        print("[init_db] duplicate candidates.tg_id found, run merge_candidates.py to enable the unique index")
+
+    # зведені таблиці + тригери для /api/hr/overview
+    overview.install(c)
+
+    # реєстр архівних файлів (див. archive.py)
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS archive_periods (
+            period TEXT PRIMARY KEY,
+            path TEXT,
+            period_start TEXT,
+            period_end TEXT,
+            rows INTEGER,
+            archived_at TEXT
+        )
+        """
+    )
+    for table in RESULT_TABLES:
+        c.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table} (created_at)")
+
     c.execute("SELECT COUNT(*) FROM hr_billing")
     if c.fetchone()[0] == 0:
         c.execute(
@@ -194,11 +306,105 @@ def init_db():
             ("demo@example.com", "free", None),
         )
 
+    c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
     conn.commit()
     conn.close()
 
 
-init_db()
+def ensure_db(db_path: Optional[Path] = None):
+    """Запускає init_db() лише якщо схема ще не на поточній версії.
+
+    Викликається з lifespan: перший воркер деплою створює схему,
+    решта бачать user_version і пропускають DDL.
+    """
+    conn = get_conn(db_path)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    conn.close()
+    if version < SCHEMA_VERSION:
+        init_db(db_path)
+
+
+shard_router = ShardRouter(ADMIN_API_KEY, DB_PATH, TENANTS_DB_PATH, SHARDS_DIR, init_shard=ensure_db)
+app.add_middleware(TenantMiddleware, router=shard_router)
+
+event_bus = EventBus()
+# ліміти паралельності + черги для CPU-важких класів маршрутів (див. admission.py)
+admission = build_gates()
+
+
+def publish_event(event_type: str, data: Dict[str, Any]):
+    """Компактна подія для SSE-стріму HR-панелі (канал = tenant запиту)."""
+    tenant = current_tenant.get() or shard_router.default
+    event_bus.publish(tenant.tenant_id, event_type, data)
+
+
+# по одному кешу аналізів на шард: LRU, як і таблиця analysis_cache, не спільний між tenant-ами
+_caches: Dict[str, AnalysisCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    tenant = current_tenant.get() or shard_router.default
+    cache = _caches.get(tenant.tenant_id)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(tenant.tenant_id)
+            if cache is None:
+                cache = AnalysisCache(lambda t=tenant: shard_router.connect(t))
+                _caches[tenant.tenant_id] = cache
+    return cache
+
+
+# по одному потоку-писачу на шард
+_writers: Dict[str, GroupCommitWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer() -> GroupCommitWriter:
+    tenant = current_tenant.get() or shard_router.default
+    writer = _writers.get(tenant.tenant_id)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(tenant.tenant_id)
+            if writer is None:
+                writer = GroupCommitWriter(lambda path=tenant.db_path: sqlite3.connect(path))
+                writer.start()
+                _writers[tenant.tenant_id] = writer
+    return writer
+
+
+def run_write(statements: List[Tuple[str, Sequence[Any]]]) -> List[int]:
+    """Виконує вставки атомарно і повертає lastrowid кожної (після commit)."""
+    if WRITE_BEHIND:
+        return get_writer().submit(statements).result()
+    conn = get_conn()
+    try:
+        ids = [conn.execute(sql, params).lastrowid for sql, params in statements]
+        conn.commit()
+    finally:
+        conn.close()
+    return ids
+
+
+def get_history_conn(candidate_id: int):
+    """З'єднання для читання історії кандидата разом з архівами, які вона зачіпає."""
+    conn = get_conn()
+    row = conn.execute("SELECT created_at FROM candidates WHERE id = ?", (candidate_id,)).fetchone()
+    if row:
+        attach_archives(conn, since=row[0], candidate_id=candidate_id)
+    return conn
+
+
+async def run_write_async(statements: List[Tuple[str, Sequence[Any]]]) -> List[int]:
+    """run_write для async-ендпоінтів: ні commit/fsync, ні очікування черги — не в event loop."""
+    if WRITE_BEHIND:
+        try:
+            fut = get_writer().submit(statements, block=False)
+        except queue.Full:
+            raise HTTPException(status_code=503, detail="Write queue is full, retry later", headers={"Retry-After": "1"})
+        return await asyncio.wrap_future(fut)
+    return await run_in_threadpool(run_write, statements)
 
 
 class StartTestRequest(BaseModel):
@@ -367,15 +573,34 @@ def api_tests_list(x_admin_key: Optional[str] = Header(None)):
 
 @app.post("/api/candidate/start_test", response_model=StartTestResponse)
 def start_test(payload: StartTestRequest):
+    """Ідемпотентно: повторний /start того ж tg_id повертає існуючого кандидата."""
     conn = get_conn()
     c = conn.cursor()
-    c.execute(
-        "INSERT INTO candidates (tg_id, full_name, created_at) VALUES (?, ?, ?)",
-        (payload.tg_id, payload.full_name or "", datetime.datetime.utcnow().isoformat()),
-    )
-    candidate_id = c.lastrowid
-    conn.commit()
-    conn.close()
+    try:
+        c.execute("SELECT id FROM candidates WHERE tg_id = ? ORDER BY id LIMIT 1", (payload.tg_id,))
+        row = c.fetchone()
+        if row is None:
+            try:
+                c.execute(
+                    "INSERT INTO candidates (tg_id, full_name, created_at) VALUES (?, ?, ?)",
+                    (payload.tg_id, payload.full_name or "", datetime.datetime.utcnow().isoformat()),
+                )
+                candidate_id = c.lastrowid
+            except sqlite3.IntegrityError:
+                # паралельний start_test встиг вставити того ж tg_id
+                conn.rollback()
+                c.execute("SELECT id FROM candidates WHERE tg_id = ?", (payload.tg_id,))
+                candidate_id = c.fetchone()[0]
+        else:
+            candidate_id = row[0]
+            if payload.full_name:
+                c.execute(
+                    "UPDATE candidates SET full_name = ? WHERE id = ? AND full_name != ?",
+                    (payload.full_name, candidate_id, payload.full_name),
+                )
+        conn.commit()
+    finally:
+        conn.close()
     return StartTestResponse(candidate_id=candidate_id)
 
 
@@ -387,42 +612,45 @@ def submit_test(payload: SubmitTestRequest):
     scores = compute_scores_for_test(payload.test_type, payload.answers)
     report_dict = generate_hr_report(payload.test_type, scores)
 
-    conn = get_conn()
-    c = conn.cursor()
     now = datetime.datetime.utcnow().isoformat()
 
-    c.execute(
-        """
-        INSERT INTO test_results (candidate_id, test_type, raw_answers, scores_json, created_at)
-        VALUES (?, ?, ?, ?, ?)
-        """,
+    test_result_id, _ = run_write([
         (
-            payload.candidate_id,
-            payload.test_type,
-            json.dumps(payload.answers, ensure_ascii=False),
-            json.dumps(scores, ensure_ascii=False),
-            now,
+            """
+            INSERT INTO test_results (candidate_id, test_type, raw_answers, scores_json, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (
+                payload.candidate_id,
+                payload.test_type,
+                json.dumps(payload.answers, ensure_ascii=False),
+                json.dumps(scores, ensure_ascii=False),
+                now,
+            ),
         ),
-    )
-
-    c.execute(
-        """
-        INSERT INTO ai_reports (candidate_id, test_type, summary, recommendations, risk_level, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
         (
-            payload.candidate_id,
-            payload.test_type,
-            report_dict["summary"],
-            json.dumps(report_dict["recommendations"], ensure_ascii=False),
-            report_dict["risk_level"],
-            now,
+            """
+            INSERT INTO ai_reports (candidate_id, test_type, summary, recommendations, risk_level, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                payload.candidate_id,
+                payload.test_type,
+                report_dict["summary"],
+                json.dumps(report_dict["recommendations"], ensure_ascii=False),
+                report_dict["risk_level"],
+                now,
+            ),
         ),
-    )
-
-    conn.commit()
-    conn.close()
-    return {"status": "ok", "scores": scores, "report": report_dict}
+    ])
+    publish_event("test_result", {
+        "id": test_result_id,
+        "candidate_id": payload.candidate_id,
+        "test_type": payload.test_type,
+        "risk_level": report_dict["risk_level"],
+        "ts": now,
+    })
+    return {"status": "ok", "test_result_id": test_result_id, "scores": scores, "report": report_dict}
 
 
 @app.post("/api/voice/analyze")
@@ -430,29 +658,50 @@ async def voice_analyze(
     candidate_id: int = Form(...),
     file: UploadFile = File(...),
 ):
-    raw = await file.read()
-    result = analyze_voice_bytes(raw, file.content_type or file.filename)
+    upload = await spool_upload(file, "voice")
+    digest = upload.digest
+    analysis_cache = get_analysis_cache()
+    result = await run_in_threadpool(analysis_cache.get, "voice", digest)
+    cached = result is not None
+    if not cached:
+        from ai.voice import analyze_voice_bytes
+
+        async with admission["voice"].slot():
+            result = await run_in_threadpool(
+                analyze_voice_bytes, upload.file, file.content_type or file.filename
+            )
 
-    conn = get_conn()
-    c = conn.cursor()
     now = datetime.datetime.utcnow().isoformat()
-    c.execute(
-        """
-        INSERT INTO voice_results (candidate_id, stress_score, level, details_json, created_at)
-        VALUES (?, ?, ?, ?, ?)
-        """,
+    # рядок кешу (або оновлення last_used_at) — у тій самій транзакції, без окремого коміту
+    if cached:
+        cache_rows = analysis_cache.touch("voice", digest)
+    else:
+        cache_rows = analysis_cache.put("voice", digest, result)
+    result_id, *_ = await run_write_async([
         (
-            candidate_id,
-            float(result["stress_score"]),
-            result["level"],
-            json.dumps(result, ensure_ascii=False),
-            now,
+            """
+            INSERT INTO voice_results (candidate_id, stress_score, level, details_json, created_at, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                candidate_id,
+                float(result["stress_score"]),
+                result["level"],
+                json.dumps(result, ensure_ascii=False),
+                now,
+                digest,
+            ),
         ),
-    )
-    conn.commit()
-    conn.close()
+    ] + cache_rows)
 
-    return {"status": "ok", "candidate_id": candidate_id, "voice": result}
+    publish_event("voice_result", {
+        "id": result_id,
+        "candidate_id": candidate_id,
+        "stress_score": result["stress_score"],
+        "level": result["level"],
+        "ts": now,
+    })
+    return {"status": "ok", "candidate_id": candidate_id, "result_id": result_id, "voice": result, "cached": cached}
 
 
 @app.post("/api/photo/analyze")
@@ -460,30 +709,230 @@ async def photo_analyze(
     candidate_id: int = Form(...),
     file: UploadFile = File(...),
 ):
-    raw = await file.read()
-    result = analyze_photo_bytes(raw)
+    upload = await spool_upload(file, "photo")
+    digest = upload.digest
+    analysis_cache = get_analysis_cache()
+    result = await run_in_threadpool(analysis_cache.get, "photo", digest)
+    cached = result is not None
+    if not cached:
+        from ai.photo import analyze_photo_bytes
+
+        async with admission["photo"].slot():
+            result = await run_in_threadpool(analyze_photo_bytes, upload.file)
 
-    conn = get_conn()
-    c = conn.cursor()
     now = datetime.datetime.utcnow().isoformat()
-    c.execute(
-        """
-        INSERT INTO photo_results (candidate_id, mood, fatigue_level, brightness, contrast, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
+    # рядок кешу (або оновлення last_used_at) — у тій самій транзакції, без окремого коміту
+    if cached:
+        cache_rows = analysis_cache.touch("photo", digest)
+    else:
+        cache_rows = analysis_cache.put("photo", digest, result)
+    result_id, *_ = await run_write_async([
         (
-            candidate_id,
-            result["mood"],
-            result["fatigue_level"],
-            float(result["brightness"]),
-            float(result["contrast"]),
-            now,
+            """
+            INSERT INTO photo_results (candidate_id, mood, fatigue_level, brightness, contrast, created_at, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                candidate_id,
+                result["mood"],
+                result["fatigue_level"],
+                float(result["brightness"]),
+                float(result["contrast"]),
+                now,
+                digest,
+            ),
         ),
+    ] + cache_rows)
+
+    publish_event("photo_result", {
+        "id": result_id,
+        "candidate_id": candidate_id,
+        "mood": result["mood"],
+        "fatigue_level": result["fatigue_level"],
+        "ts": now,
+    })
+    return {"status": "ok", "candidate_id": candidate_id, "result_id": result_id, "photo": result, "cached": cached}
+
+
+@app.post("/api/video/analyze")
+async def video_analyze(
+    candidate_id: int = Form(...),
+    fps: Optional[float] = Form(None),
+    file: UploadFile = File(...),
+):
+    """Коротке відео: кадри з частотою fps -> метрики фото; агрегат пишеться в photo_results."""
+    from ai.video import DEFAULT_FPS, analyze_video_bytes, clamp_fps, ffmpeg_available
+
+    if not ffmpeg_available():
+        raise HTTPException(status_code=503, detail="Video analysis is unavailable: ffmpeg not installed")
+
+    fps = clamp_fps(fps or DEFAULT_FPS)
+    upload = await spool_upload(file, "video")
+    digest = upload.digest
+    # таймлайн залежить від частоти вибірки — вона входить у ключ кешу
+    cache_kind = f"video@{fps:g}"
+    analysis_cache = get_analysis_cache()
+    result = await run_in_threadpool(analysis_cache.get, cache_kind, digest)
+    cached = result is not None
+    if not cached:
+        async with admission["video"].slot():
+            try:
+                result = await run_in_threadpool(analyze_video_bytes, upload.file, fps)
+            except TimeoutError as e:
+                raise HTTPException(status_code=504, detail=str(e))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+    now = datetime.datetime.utcnow().isoformat()
+    details = {k: result[k] for k in ("source", "fps", "frames", "duration_sec", "fatigue_share", "timeline")}
+    # рядок кешу (або оновлення last_used_at) — у тій самій транзакції, без окремого коміту
+    if cached:
+        cache_rows = analysis_cache.touch(cache_kind, digest)
+    else:
+        cache_rows = analysis_cache.put(cache_kind, digest, result)
+    result_id, *_ = await run_write_async([
+        (
+            """
+            INSERT INTO photo_results
+                (candidate_id, mood, fatigue_level, brightness, contrast, created_at, content_hash, details_json)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                candidate_id,
+                result["mood"],
+                result["fatigue_level"],
+                float(result["brightness"]),
+                float(result["contrast"]),
+                now,
+                digest,
+                json.dumps(details, ensure_ascii=False),
+            ),
+        ),
+    ] + cache_rows)
+
+    publish_event("photo_result", {
+        "id": result_id,
+        "candidate_id": candidate_id,
+        "mood": result["mood"],
+        "fatigue_level": result["fatigue_level"],
+        "source": "video",
+        "ts": now,
+    })
+    return {"status": "ok", "candidate_id": candidate_id, "result_id": result_id, "video": result, "cached": cached}
+
+
+@app.get("/api/hr/events")
+async def hr_events(
+    x_admin_key: Optional[str] = Header(None),
+    last_event_id: Optional[str] = Header(None),
+    admin_key: Optional[str] = Query(None),
+    last_id: Optional[str] = Query(None),
+):
+    """SSE-стрім нових test/voice/photo результатів замість поллінгу.
+
+    Браузерний EventSource не вміє слати заголовки, тому ключ і Last-Event-ID
+    можна передати також як ?admin_key=...&last_id=...
+    """
+    key = x_admin_key or admin_key
+    check_admin(key)
+    tenant = shard_router.tenant_for_key(key)
+    return StreamingResponse(
+        event_bus.stream(tenant.tenant_id, last_event_id or last_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    conn.commit()
-    conn.close()
 
-    return {"status": "ok", "candidate_id": candidate_id, "photo": result}
+
+@app.get("/api/hr/admission")
+def admission_status(x_admin_key: Optional[str] = Header(None)):
+    check_admin(x_admin_key)
+    return {name: gate.stats() for name, gate in admission.items()}
+
+
+@app.get("/api/hr/runtime")
+def runtime_status(x_admin_key: Optional[str] = Header(None)):
+    """Внутрішні лічильники воркера для tenant-а ключа: кеш аналізів, writer шарду, SSE-підписники."""
+    check_admin(x_admin_key)
+    tenant = current_tenant.get() or shard_router.default
+    writer = _writers.get(tenant.tenant_id)
+    cache = _caches.get(tenant.tenant_id)
+    return {
+        "analysis_cache": cache.stats() if cache else None,
+        "write_behind": WRITE_BEHIND,
+        "writer": writer.stats() if writer else None,
+        "events": {"subscribers": event_bus.subscriber_count(tenant.tenant_id)},
+    }
+
+
+@app.get("/api/hr/overview")
+def hr_overview(days: int = 14, weeks: int = 8, x_admin_key: Optional[str] = Header(None)):
+    check_admin(x_admin_key)
+    conn = get_conn()
+    try:
+        return overview.read_overview(conn, days=max(1, min(days, 366)), weeks=max(1, min(weeks, 104)))
+    finally:
+        conn.close()
+
+
+class SlotStreamingResponse(StreamingResponse):
+    """StreamingResponse, що звільняє admission-слот після відповіді —
+    і тоді, коли генератор тіла так і не стартував (клієнт відключився)."""
+
+    def __init__(self, slot: AsyncExitStack, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._slot.aclose()
+
+
+@app.get("/api/hr/export")
+async def hr_export(
+    kind: str = "tests",
+    fmt: str = Query("ndjson", alias="format"),
+    gzip: bool = False,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    test_type: Optional[str] = None,
+    x_admin_key: Optional[str] = Header(None),
+):
+    """Потокове вивантаження test/voice/photo результатів (разом з архівами) для аналітики."""
+    check_admin(x_admin_key)
+    if kind not in EXPORT_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unsupported kind (use {', '.join(EXPORT_KINDS)})")
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Unsupported format (use csv or ndjson)")
+    if test_type is not None and test_type not in SUPPORTED_TESTS:
+        raise HTTPException(status_code=400, detail="Unsupported test_type")
+
+    tenant = current_tenant.get() or shard_router.default
+    sources = await run_in_threadpool(export_sources, tenant.db_path, since, until)
+    trait_keys = list(SUPPORTED_TESTS[test_type]["traits"]) if test_type else None
+    rows = iter_export(sources, kind, fmt, since, until, test_type, trait_keys, gzip)
+
+    # слот береться до відповіді (429 — замість 200 + обірваного стріму)
+    # і тримається весь час стріму; звільняє його SlotStreamingResponse
+    slot = AsyncExitStack()
+    await slot.enter_async_context(admission["export"].slot())
+
+    async def body():
+        try:
+            async for chunk in iterate_in_threadpool(rows):
+                yield chunk
+        finally:
+            rows.close()
+
+    filename = f"{kind}_{tenant.tenant_id}.{'csv' if fmt == 'csv' else 'ndjson'}" + (".gz" if gzip else "")
+    media_type = "text/csv; charset=utf-8" if fmt == "csv" else "application/x-ndjson"
+    return SlotStreamingResponse(
+        slot,
+        body(),
+        media_type="application/gzip" if gzip else media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
 
 @app.get("/api/hr/candidates", response_model=List[CandidateDTO])
@@ -503,7 +952,7 @@ def list_candidates(x_admin_key: Optional[str] = Header(None)):
 @app.get("/api/hr/candidate/{candidate_id}", response_model=CandidateDetailDTO)
 def get_candidate(candidate_id: int, x_admin_key: Optional[str] = Header(None)):
     check_admin(x_admin_key)
-    conn = get_conn()
+    conn = get_history_conn(candidate_id)
     c = conn.cursor()
 
     # Candidate
@@ -593,7 +1042,7 @@ def get_candidate(candidate_id: int, x_admin_key: Optional[str] = Header(None)):
 def candidate_stats(candidate_id: int, x_admin_key: Optional[str] = Header(None)):
     check_admin(x_admin_key)
 
-    conn = get_conn()
+    conn = get_history_conn(candidate_id)
     c = conn.cursor()
 
     # stress timeline
@@ -652,7 +1101,7 @@ def candidate_stats(candidate_id: int, x_admin_key: Optional[str] = Header(None)
 def hr_progress(candidate_id: int, x_admin_key: Optional[str] = Header(None)):
     check_admin(x_admin_key)
 
-    conn = get_conn()
+    conn = get_history_conn(candidate_id)
     c = conn.cursor()
 
     # Fetch tests
@@ -752,14 +1201,16 @@ def billing_activate_demo(days: int = 14, x_admin_key: Optional[str] = Header(No
     return BillingStatus(email=row[0], plan=row[1], demo_until=row[2])
 
 @app.get("/api/hr/candidate/{candidate_id}/pdf")
-def pdf_full(candidate_id: int, x_admin_key: Optional[str] = Header(None)):
+async def pdf_full(candidate_id: int, x_admin_key: Optional[str] = Header(None)):
     check_admin(x_admin_key)
+    from ai.reports import build_pdf_report
 
-    # reuse existing endpoint
-    detail = get_candidate(candidate_id, x_admin_key)
+    async with admission["pdf"].slot():
+        # reuse existing endpoint
+        detail = await run_in_threadpool(get_candidate, candidate_id, x_admin_key)
 
-    # generate PDF with your existing builder
-    pdf_bytes = build_pdf_report(detail.dict())
+        # generate PDF with your existing builder
+        pdf_bytes = await run_in_threadpool(build_pdf_report, detail.dict())
 
     return StreamingResponse(
         io.BytesIO(pdf_bytes),
@@ -0,0 +1,287 @@
+"""
+Hot/cold tiering: архівація старих результатів в окремі SQLite-файли
+--------------------------------------------------------------------
++ archive_old_results() переносить рядки test_results / ai_reports /
+  voice_results / photo_results, старші за retention, у файли
+  archive/hrpsy_archive_<period>.db (period = year | quarter | month)
++ перенесення йде пачками в одній транзакції main+archive (ATTACH),
+  тож рядок ніколи не буває в обох файлах або в жодному
++ після перенесення гарячий файл стискається через PRAGMA incremental_vacuum
++ attach_archives() підключає потрібні архіви до з'єднання і створює
+  TEMP VIEW з тими ж іменами таблиць — запити історії не змінюються;
+  понад MAX_ATTACHED архівів рядки кандидата читаються по одному файлу
+
+    python archive.py --retention-days 180 --period quarter [--all-shards]
+"""
+
+import argparse
+import datetime
+import sqlite3
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+RESULT_TABLES = ("test_results", "ai_reports", "voice_results", "photo_results")
+ARCHIVE_PREFIX = "hrpsy_archive_"
+# SQLite за замовчуванням дозволяє 10 приєднаних БД
+MAX_ATTACHED = 10
+# TEMP-таблиці з рядками кандидата, коли архівів більше за MAX_ATTACHED
+ARCHIVE_ROWS_PREFIX = "_archived_"
+
+
+def period_bounds(ts: str, period: str) -> Tuple[str, str, str]:
+    """ISO-мітка -> (назва періоду, початок, кінець) як ISO-дати."""
+    d = datetime.date.fromisoformat(ts[:10])
+    if period == "year":
+        start, end = datetime.date(d.year, 1, 1), datetime.date(d.year + 1, 1, 1)
+        name = f"{d.year}"
+    elif period == "quarter":
+        q = (d.month - 1) // 3
+        start = datetime.date(d.year, q * 3 + 1, 1)
+        end = datetime.date(d.year + (q == 3), (q * 3 + 3) % 12 + 1, 1)
+        name = f"{d.year}-Q{q + 1}"
+    elif period == "month":
+        start = datetime.date(d.year, d.month, 1)
+        end = datetime.date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+        name = f"{d.year}-{d.month:02d}"
+    else:
+        raise ValueError(f"Unknown period: {period}")
+    return name, start.isoformat(), end.isoformat()
+
+
+def _columns(conn, schema: str, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _ensure_archive_tables(conn, schema: str):
+    for table in RESULT_TABLES:
+        (sql,) = conn.execute(
+            "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        conn.execute(sql.replace(f"CREATE TABLE {table}", f"CREATE TABLE IF NOT EXISTS {schema}.{table}", 1))
+        # нові колонки гарячої схеми (ALTER TABLE ADD COLUMN) дописуємо й в архів
+        have = set(_columns(conn, schema, table))
+        for cid, name, decl, *_ in conn.execute(f"PRAGMA main.table_info({table})"):
+            if name not in have:
+                conn.execute(f"ALTER TABLE {schema}.{table} ADD COLUMN {name} {decl}")
+        # архів читається лише по кандидату
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_candidate ON {table} (candidate_id)"
+        )
+
+
+def _move_period(conn, schema: str, lower: str, upper: str, batch_size: int) -> int:
+    moved = 0
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _archive_ids (id INTEGER PRIMARY KEY)")
+    for table in RESULT_TABLES:
+        cols = ", ".join(_columns(conn, "main", table))
+        while True:
+            conn.execute("DELETE FROM temp._archive_ids")
+            conn.execute(
+                f"""
+                INSERT INTO temp._archive_ids
+                SELECT id FROM main.{table}
+                WHERE created_at >= ? AND created_at < ?
+                ORDER BY id LIMIT ?
+                """,
+                (lower, upper, batch_size),
+            )
+            n = conn.execute("SELECT COUNT(*) FROM temp._archive_ids").fetchone()[0]
+            if not n:
+                break
+            conn.execute(
+                f"INSERT OR REPLACE INTO {schema}.{table} ({cols}) "
+                f"SELECT {cols} FROM main.{table} WHERE id IN (SELECT id FROM temp._archive_ids)"
+            )
+            conn.execute(f"DELETE FROM main.{table} WHERE id IN (SELECT id FROM temp._archive_ids)")
+            conn.commit()
+            moved += n
+    conn.commit()
+    return moved
+
+
+def enable_incremental_vacuum(conn) -> bool:
+    """Переводить файл в auto_vacuum=INCREMENTAL (одноразовий повний VACUUM)."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def archive_old_results(
+    db_path: Path,
+    archive_dir: Path,
+    retention_days: int,
+    period: str = "year",
+    batch_size: int = 5000,
+) -> dict:
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=retention_days)).date().isoformat()
+
+    conn = sqlite3.connect(db_path)
+    oldest = [
+        conn.execute(f"SELECT MIN(created_at) FROM {table} WHERE created_at < ?", (cutoff,)).fetchone()[0]
+        for table in RESULT_TABLES
+    ]
+    oldest = [ts for ts in oldest if ts]
+
+    moved_by_period = {}
+    if oldest:
+        ts = min(oldest)
+        while ts < cutoff:
+            name, start, end = period_bounds(ts, period)
+            path = (archive_dir / f"{ARCHIVE_PREFIX}{name}.db").resolve()
+            conn.execute("ATTACH DATABASE ? AS arch", (str(path),))
+            try:
+                _ensure_archive_tables(conn, "arch")
+                conn.commit()
+                moved = _move_period(conn, "arch", start, min(end, cutoff), batch_size)
+            finally:
+                conn.execute("DETACH DATABASE arch")
+            if moved:
+                conn.execute(
+                    """
+                    INSERT INTO archive_periods (period, path, period_start, period_end, rows, archived_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(period) DO UPDATE SET
+                        rows = rows + excluded.rows,
+                        archived_at = excluded.archived_at
+                    """,
+                    (name, str(path), start, end, moved, datetime.datetime.utcnow().isoformat()),
+                )
+                conn.commit()
+                moved_by_period[name] = moved
+            ts = end
+
+    pages_before = conn.execute("PRAGMA page_count").fetchone()[0]
+    if not enable_incremental_vacuum(conn):
+        # executescript крокує pragma до кінця; execute() звільняє лише одну сторінку
+        conn.executescript("PRAGMA incremental_vacuum;")
+    pages_after = conn.execute("PRAGMA page_count").fetchone()[0]
+    conn.close()
+
+    return {
+        "cutoff": cutoff,
+        "moved": moved_by_period,
+        "pages_before": pages_before,
+        "pages_after": pages_after,
+    }
+
+
+def attach_archives(conn, since: Optional[str] = None, candidate_id: Optional[int] = None) -> int:
+    """Підключає архіви, що можуть містити рядки новіші за `since`.
+
+    Для кожної таблиці результатів створюється TEMP VIEW з тим самим іменем
+    (main UNION ALL архіви). TEMP-об'єкти мають пріоритет при розборі
+    некваліфікованих імен, тож існуючі SELECT-и бачать і гарячі, і архівні дані.
+    Якщо архівів більше, ніж SQLite дозволяє приєднати, а запит стосується
+    одного кандидата — його рядки читаються з архівів по одному файлу
+    у TEMP-таблиці за тими ж VIEW. Повертає кількість задіяних архівів.
+    """
+    if since:
+        rows = conn.execute(
+            "SELECT path FROM archive_periods WHERE period_end > ? ORDER BY period_start", (since,)
+        ).fetchall()
+    else:
+        rows = conn.execute("SELECT path FROM archive_periods ORDER BY period_start").fetchall()
+    paths = [r[0] for r in rows if Path(r[0]).exists()]
+    if not paths:
+        return 0
+    if len(paths) > MAX_ATTACHED:
+        if candidate_id is None:
+            raise RuntimeError(
+                f"History spans {len(paths)} archives, more than SQLite can attach; use a coarser --period"
+            )
+        _copy_candidate_archives(conn, paths, candidate_id)
+        return len(paths)
+
+    for i, path in enumerate(paths):
+        conn.execute(f"ATTACH DATABASE ? AS arch{i}", (path,))
+
+    for table in RESULT_TABLES:
+        cols = _columns(conn, "main", table)
+        selects = [f"SELECT {', '.join(cols)} FROM main.{table}"]
+        for i in range(len(paths)):
+            have = set(_columns(conn, f"arch{i}", table))
+            if not have:
+                continue
+            select_list = ", ".join(c if c in have else f"NULL AS {c}" for c in cols)
+            selects.append(f"SELECT {select_list} FROM arch{i}.{table}")
+        conn.execute(f"CREATE TEMP VIEW IF NOT EXISTS {table} AS " + " UNION ALL ".join(selects))
+    return len(paths)
+
+
+def _copy_candidate_archives(conn, paths: List[str], candidate_id: int):
+    """Рядки кандидата з усіх архівів -> temp.{ARCHIVE_ROWS_PREFIX}<table>, по одному ATTACH за раз."""
+    for table in RESULT_TABLES:
+        cols = ", ".join(_columns(conn, "main", table))
+        conn.execute(f"DROP TABLE IF EXISTS temp.{ARCHIVE_ROWS_PREFIX}{table}")
+        conn.execute(
+            f"CREATE TEMP TABLE {ARCHIVE_ROWS_PREFIX}{table} AS SELECT {cols} FROM main.{table} WHERE 0"
+        )
+
+    for path in paths:
+        conn.execute("ATTACH DATABASE ? AS arch", (path,))
+        try:
+            for table in RESULT_TABLES:
+                have = set(_columns(conn, "arch", table))
+                if not have:
+                    continue
+                cols = _columns(conn, "main", table)
+                select_list = ", ".join(c if c in have else f"NULL AS {c}" for c in cols)
+                conn.execute(
+                    f"INSERT INTO temp.{ARCHIVE_ROWS_PREFIX}{table} ({', '.join(cols)}) "
+                    f"SELECT {select_list} FROM arch.{table} WHERE candidate_id = ?",
+                    (candidate_id,),
+                )
+            # INSERT у TEMP відкриває транзакцію, а DETACH всередині неї неможливий
+            conn.commit()
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.execute("DETACH DATABASE arch")
+
+    for table in RESULT_TABLES:
+        cols = ", ".join(_columns(conn, "main", table))
+        conn.execute(
+            f"CREATE TEMP VIEW IF NOT EXISTS {table} AS "
+            f"SELECT {cols} FROM main.{table} UNION ALL SELECT {cols} FROM temp.{ARCHIVE_ROWS_PREFIX}{table}"
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    from app import DB_PATH, ensure_db, shard_router
+
+    ap = argparse.ArgumentParser(description="Move old results into per-period archive databases")
+    ap.add_argument("--db", type=Path, default=DB_PATH)
+    ap.add_argument("--all-shards", action="store_true", help="run for every tenant shard")
+    ap.add_argument(
+        "--archive-dir", type=Path, default=None,
+        help="default: <db dir>/archive; with --all-shards: <archive-dir>/<tenant_id>",
+    )
+    ap.add_argument("--retention-days", type=int, default=180)
+    ap.add_argument("--period", choices=["year", "quarter", "month"], default="year")
+    ap.add_argument("--batch-size", type=int, default=5000)
+    args = ap.parse_args(argv)
+
+    if args.all_shards:
+        # імена архівів залежать лише від періоду — спільний каталог розводимо по tenant-ах
+        targets = [
+            (t.db_path, args.archive_dir / t.tenant_id if args.archive_dir else t.db_path.parent / "archive")
+            for t in shard_router.list_tenants()
+        ]
+    else:
+        targets = [(args.db, args.archive_dir or args.db.parent / "archive")]
+
+    for db_path, archive_dir in targets:
+        ensure_db(db_path)
+        report = archive_old_results(db_path, archive_dir, args.retention_days, args.period, args.batch_size)
+        if args.all_shards:
+            print(f"{db_path}:")
+        for name, n in report["moved"].items():
+            print(f"{name:10s} {n:>10,d} rows")
+        print(f"cutoff {report['cutoff']}, pages {report['pages_before']} -> {report['pages_after']}")
+
+
+if __name__ == "__main__":
+    main()
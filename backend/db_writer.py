@@ -0,0 +1,140 @@
+"""
+Group-commit writer для вставок результатів
+-------------------------------------------
+Один потік-писач забирає задачі з черги і комітить їх пачками
+(до max_batch задач або max_delay секунд), тож під сплеском навантаження
+SQLite робить один fsync на пачку замість одного на запит.
+
+Кожна задача — список (sql, params), що виконується атомарно.
+Future задачі завершується лише після commit() пачки і містить
+lastrowid кожного statement, тобто виклик отримує id і гарантію запису.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+Statement = Tuple[str, Sequence[Any]]
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    def __init__(
+        self,
+        conn_factory: Callable[[], Any],
+        max_batch: int = 64,
+        max_delay: float = 0.005,
+        max_queue: int = 10_000,
+    ):
+        self._conn_factory = conn_factory
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.jobs = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Дописує все, що вже в черзі, і зупиняє потік."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, statements: List[Statement], block: bool = True) -> Future:
+        """block=False — для event loop: при повній черзі одразу queue.Full, а не очікування."""
+        if self._thread is None:
+            raise RuntimeError("GroupCommitWriter is not running")
+        fut: Future = Future()
+        self._queue.put((statements, fut), block=block)
+        return fut
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "queue": self.qsize(),
+            "batches": self.batches,
+            "jobs": self.jobs,
+            "avg_batch": round(self.jobs / self.batches, 1) if self.batches else None,
+        }
+
+    def _collect(self, first) -> Tuple[list, bool]:
+        batch = [first]
+        deadline = time.monotonic() + self._max_delay
+        while len(batch) < self._max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    @staticmethod
+    def _execute(conn, statements: List[Statement]) -> List[int]:
+        ids = []
+        for sql, params in statements:
+            cur = conn.execute(sql, params)
+            ids.append(cur.lastrowid)
+        return ids
+
+    def _flush(self, conn, batch: list):
+        try:
+            results = [self._execute(conn, statements) for statements, _ in batch]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            # одна зламана задача не повинна валити всю пачку — повтор поштучно
+            for statements, fut in batch:
+                try:
+                    ids = self._execute(conn, statements)
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    fut.set_exception(e)
+                else:
+                    fut.set_result(ids)
+        else:
+            for (_, fut), ids in zip(batch, results):
+                fut.set_result(ids)
+        self.batches += 1
+        self.jobs += len(batch)
+
+    def _run(self):
+        conn = self._conn_factory()
+        try:
+            while True:
+                first = self._queue.get()
+                if first is _STOP:
+                    break
+                batch, stop = self._collect(first)
+                self._flush(conn, batch)
+                if stop:
+                    break
+            # задачі, що встигли потрапити в чергу після _STOP
+            leftover = []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    leftover.append(item)
+            if leftover:
+                self._flush(conn, leftover)
+        finally:
+            conn.close()
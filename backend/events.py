@@ -0,0 +1,144 @@
+"""
+In-process pub/sub для SSE-стріму нових результатів
+---------------------------------------------------
++ publish() потокобезпечний: викликається і з async-ендпоінтів, і з sync
+  (threadpool) — доставка в asyncio.Queue підписника йде через call_soon_threadsafe
++ кожен підписник має обмежену чергу; повільний клієнт не гальмує інших:
+  при переповненні він дочитує пропущене з кільцевого буфера історії
++ Last-Event-ID: при перепідключенні клієнт отримує події після свого id,
+  якщо вони ще в буфері, інакше — подію "resync" (перечитати дані через API)
++ id подій монотонні і починаються з мітки часу старту процесу,
+  тож id з попереднього запуску гарантовано дають "resync"
+
+Лише в межах одного процесу: з кількома воркерами кожен бачить свої події.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+KEEPALIVE_SEC = 15.0
+
+Event = Tuple[int, str, str]  # (id, type, json data)
+
+
+def format_sse(event_id: Optional[int], event_type: str, data: str) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\ndata: {data}\n\n"
+
+
+class _Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=maxsize)
+        self.lagged = False
+
+    def offer(self, event: Event):
+        # виконується в event loop підписника
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+
+class EventBus:
+    def __init__(self, history: int = 1000, queue_size: int = 100):
+        self._history_size = history
+        self._queue_size = queue_size
+        self._next_id = int(time.time() * 1000)
+        self._first_id = self._next_id
+        self._history: Dict[str, Deque[Event]] = {}
+        # найбільший id, витіснений з буфера каналу
+        self._evicted: Dict[str, int] = {}
+        self._subscribers: Dict[str, Set[_Subscriber]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, event_type: str, data: dict) -> int:
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            event_id = self._next_id
+            self._next_id += 1
+            event = (event_id, event_type, payload)
+            history = self._history.setdefault(channel, deque(maxlen=self._history_size))
+            if len(history) == self._history_size:
+                self._evicted[channel] = history[0][0]
+            history.append(event)
+            subscribers = list(self._subscribers.get(channel, ()))
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, event)
+            except RuntimeError:
+                # loop підписника вже закритий
+                pass
+        return event_id
+
+    def subscriber_count(self, channel: Optional[str] = None) -> int:
+        with self._lock:
+            if channel is not None:
+                return len(self._subscribers.get(channel, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+    def _replay(self, channel: str, after: int) -> Optional[List[Event]]:
+        """Події каналу з id > after; None, якщо їх уже не відновити з буфера."""
+        with self._lock:
+            if after < self._first_id - 1 or after >= self._next_id:
+                return None
+            if after < self._evicted.get(channel, after):
+                return None
+            return [e for e in self._history.get(channel, ()) if e[0] > after]
+
+    async def stream(self, channel: str, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        sub = _Subscriber(asyncio.get_running_loop(), self._queue_size)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(sub)
+            last_sent = self._next_id - 1
+        try:
+            if last_event_id:
+                try:
+                    after = int(last_event_id)
+                except ValueError:
+                    after = -1
+                missed = self._replay(channel, after)
+                if missed is None:
+                    yield format_sse(None, "resync", "{}")
+                else:
+                    for event in missed:
+                        yield format_sse(*event)
+                        last_sent = max(last_sent, event[0])
+            yield ": connected\n\n"
+
+            while True:
+                if sub.lagged:
+                    sub.lagged = False
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    missed = self._replay(channel, last_sent)
+                    if missed is None:
+                        yield format_sse(None, "resync", "{}")
+                        with self._lock:
+                            last_sent = self._next_id - 1
+                        continue
+                    for event in missed:
+                        yield format_sse(*event)
+                        last_sent = event[0]
+                    continue
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), KEEPALIVE_SEC)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                # подія могла вже прийти через replay
+                if event[0] <= last_sent:
+                    continue
+                yield format_sse(*event)
+                last_sent = event[0]
+        finally:
+            with self._lock:
+                subs = self._subscribers.get(channel)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[channel]
@@ -0,0 +1,223 @@
+"""
+Потоковий експорт результатів (CSV / NDJSON, опційно gzip)
+----------------------------------------------------------
++ рядки читаються keyset-пагінацією (WHERE id > ? ORDER BY id LIMIT n):
+  кожна сторінка — коротка read-транзакція, тож багатогігабайтний експорт
+  не тримає SHARED-lock і не блокує коміти інших запитів
++ пам'ять стала: в роботі одна сторінка рядків і один буфер виводу
++ архівні файли (archive.py) читаються напряму, по черзі, перед гарячою БД;
+  файли, період яких не перетинає since/until, пропускаються
+"""
+
+import csv
+import io
+import json
+import sqlite3
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+PAGE_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+# kind -> (таблиця, колонки)
+EXPORT_KINDS: Dict[str, Tuple[str, List[str]]] = {
+    "tests": ("test_results", ["id", "candidate_id", "test_type", "raw_answers", "scores_json", "created_at"]),
+    "voice": (
+        "voice_results",
+        ["id", "candidate_id", "stress_score", "level", "details_json", "created_at", "content_hash"],
+    ),
+    "photo": (
+        "photo_results",
+        [
+            "id", "candidate_id", "mood", "fatigue_level", "brightness", "contrast",
+            "created_at", "content_hash", "details_json",
+        ],
+    ),
+}
+
+# JSON-колонки розкодовуються: raw_answers -> answers, scores_json -> scores, details_json -> details
+JSON_COLUMNS = {"raw_answers": "answers", "scores_json": "scores", "details_json": "details"}
+
+
+def export_sources(db_path: Path, since: Optional[str], until: Optional[str]) -> List[Path]:
+    """Архіви, що перетинають [since, until), у хронологічному порядку + гаряча БД."""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT path, period_start, period_end FROM archive_periods ORDER BY period_start"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        conn.close()
+    paths = []
+    for path, start, end in rows:
+        if since and end <= since[:10]:
+            continue
+        if until and start >= until:
+            continue
+        if Path(path).exists():
+            paths.append(Path(path))
+    return paths + [db_path]
+
+
+class PageReader:
+    """Keyset-пагінація однієї таблиці в одному файлі."""
+
+    def __init__(self, path: Path, table: str, columns: Sequence[str], where: str, params: Sequence[Any]):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # колонки, додані в гарячу схему пізніше за архів, читаються як NULL
+        try:
+            have = {r[1] for r in self._conn.execute(f"PRAGMA table_info({table})")}
+        except sqlite3.Error:
+            self._conn.close()
+            raise
+        select_list = ", ".join(c if c in have else f"NULL AS {c}" for c in columns)
+        self._sql = (
+            f"SELECT {select_list} FROM {table} WHERE id > ?{where} ORDER BY id LIMIT {PAGE_SIZE}"
+        )
+        self._params = list(params)
+        self._last_id = 0
+        self.done = False
+        if not have:
+            # старий архів без таблиці; інші помилки (напр. "database is locked") не ковтаємо
+            self.close()
+
+    def next_page(self) -> List[tuple]:
+        if self.done:
+            return []
+        rows = self._conn.execute(self._sql, [self._last_id] + self._params).fetchall()
+        if len(rows) < PAGE_SIZE:
+            self.done = True
+            self._conn.close()
+        if rows:
+            self._last_id = rows[-1][0]
+        return rows
+
+    def close(self):
+        if not self.done:
+            self.done = True
+            self._conn.close()
+
+
+def build_filter(kind: str, since: Optional[str], until: Optional[str], test_type: Optional[str]):
+    where, params = "", []
+    if since:
+        where += " AND created_at >= ?"
+        params.append(since)
+    if until:
+        where += " AND created_at < ?"
+        params.append(until)
+    if test_type and kind == "tests":
+        where += " AND test_type = ?"
+        params.append(test_type)
+    return where, params
+
+
+def decode_row(columns: Sequence[str], row: tuple) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for col, value in zip(columns, row):
+        if col in JSON_COLUMNS:
+            out[JSON_COLUMNS[col]] = json.loads(value) if value else None
+        else:
+            out[col] = value
+    return out
+
+
+class RowEncoder:
+    """CSV або NDJSON; для CSV тестів одного типу бали розкладаються по колонках score_<trait>."""
+
+    def __init__(self, fmt: str, columns: Sequence[str], trait_keys: Optional[List[str]] = None):
+        self.fmt = fmt
+        self.trait_keys = trait_keys
+        self._buf = io.StringIO()
+        self._csv = csv.writer(self._buf) if fmt == "csv" else None
+        self.fields = [JSON_COLUMNS.get(c, c) for c in columns]
+        if trait_keys and "scores" in self.fields:
+            i = self.fields.index("scores")
+            self.fields[i:i + 1] = [f"score_{k}" for k in trait_keys]
+
+    def header(self) -> str:
+        if self._csv is None:
+            return ""
+        self._csv.writerow(self.fields)
+        return self._take()
+
+    def _take(self) -> str:
+        text = self._buf.getvalue()
+        self._buf.seek(0)
+        self._buf.truncate()
+        return text
+
+    def encode(self, record: Dict[str, Any]) -> str:
+        if self._csv is None:
+            return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        if self.trait_keys:
+            scores = record.pop("scores", None) or {}
+            for k in self.trait_keys:
+                record[f"score_{k}"] = scores.get(k)
+        row = []
+        for f in self.fields:
+            v = record.get(f)
+            row.append(json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else v)
+        self._csv.writerow(row)
+        return self._take()
+
+
+class Gzipper:
+    def __init__(self):
+        self._z = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def feed(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def finish(self) -> bytes:
+        return self._z.flush()
+
+
+def iter_export(
+    sources: List[Path],
+    kind: str,
+    fmt: str,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    test_type: Optional[str] = None,
+    trait_keys: Optional[List[str]] = None,
+    gzip: bool = False,
+) -> Iterator[bytes]:
+    """Синхронний генератор байтових чанків (StreamingResponse ганяє його в threadpool)."""
+    table, columns = EXPORT_KINDS[kind]
+    where, params = build_filter(kind, since, until, test_type)
+    encoder = RowEncoder(fmt, columns, trait_keys if fmt == "csv" else None)
+    gz = Gzipper() if gzip else None
+
+    pending: List[str] = [encoder.header()]
+    size = len(pending[0])
+
+    def flush() -> bytes:
+        data = "".join(pending).encode("utf-8")
+        pending.clear()
+        return gz.feed(data) if gz else data
+
+    for path in sources:
+        reader = PageReader(path, table, columns, where, params)
+        try:
+            while not reader.done:
+                for row in reader.next_page():
+                    line = encoder.encode(decode_row(columns, row))
+                    pending.append(line)
+                    size += len(line)
+                    if size >= FLUSH_BYTES:
+                        chunk = flush()
+                        size = 0
+                        if chunk:
+                            yield chunk
+        finally:
+            reader.close()
+
+    chunk = flush()
+    if chunk:
+        yield chunk
+    if gz:
+        yield gz.finish()
@@ -0,0 +1,247 @@
+"""
+Генератор синтетичних даних для навантажувального тестування SQLite-схеми
+-------------------------------------------------------------------------
+Заповнює candidates, test_results, ai_reports, voice_results та photo_results
+реалістичними даними (валідні відповіді для кожного типу з SUPPORTED_TESTS).
+
++ детермінований від --seed (та --until для однакових дат)
++ пакетні вставки executemany + pragmas для швидкого завантаження
++ налаштовуваний обсяг і розподіл
+
+Приклад:
+    python gen_synthetic.py --db /tmp/load.db --candidates 500000 --seed 42
+"""
+
+import argparse
+import datetime
+import json
+import random
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app import (
+    SUPPORTED_TESTS,
+    compute_scores_for_test,
+    generate_hr_report,
+    get_conn,
+    init_db,
+)
+from ai.voice import analyze_voice_bytes
+from ai.photo import photo_metrics
+
+BATCH_SIZE = 20000
+TG_ID_BASE = 700_000_000
+
+# Швидкість завантаження важливіша за durability: при збої файл просто генерується заново.
+LOAD_PRAGMAS = (
+    "PRAGMA journal_mode=OFF",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA locking_mode=EXCLUSIVE",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",
+)
+
+FIRST_NAMES = ["Олена", "Андрій", "Ірина", "Максим", "Марія", "Дмитро", "Софія", "Олег", "Наталія", "Тарас"]
+LAST_NAMES = ["Коваленко", "Шевченко", "Бондаренко", "Ткаченко", "Кравченко", "Мельник", "Бойко", "Савченко"]
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """'bigfive=3,mbti=1' -> {'bigfive': 3.0, 'mbti': 1.0}; без spec — рівномірно."""
+    if not spec:
+        return {code: 1.0 for code in SUPPORTED_TESTS}
+    out: Dict[str, float] = {}
+    for part in spec.split(","):
+        code, _, w = part.partition("=")
+        code = code.strip()
+        if code not in SUPPORTED_TESTS:
+            raise SystemExit(f"Unsupported test_type in --test-weights: {code}")
+        out[code] = float(w or 1.0)
+    return out
+
+
+def build_test_pool(
+    rng: random.Random, test_type: str, questions_per_trait: int, size: int
+) -> List[Tuple[str, str, str, str, str]]:
+    """Пул готових (answers, scores, summary, recommendations, risk) для одного тесту.
+
+    Відповіді/бали/звіт рахуються тим самим кодом, що й submit_test,
+    тому рядки узгоджені між собою, а на кожен рядок не витрачається CPU.
+    """
+    n_questions = questions_per_trait * len(SUPPORTED_TESTS[test_type]["traits"])
+    pool = []
+    for _ in range(size):
+        # кожен "респондент" має власний зсув, щоб бали не злипались біля 3.0
+        bias = rng.uniform(-1.2, 1.2)
+        answers = [min(5, max(1, round(rng.gauss(3 + bias, 1.0)))) for _ in range(n_questions)]
+        scores = compute_scores_for_test(test_type, answers)
+        report = generate_hr_report(test_type, scores)
+        pool.append(
+            (
+                json.dumps(answers, ensure_ascii=False),
+                json.dumps(scores, ensure_ascii=False),
+                report["summary"],
+                json.dumps(report["recommendations"], ensure_ascii=False),
+                report["risk_level"],
+            )
+        )
+    return pool
+
+
+def build_voice_pool(rng: random.Random, size: int) -> List[Tuple[float, str, str]]:
+    pool = []
+    for _ in range(size):
+        # голосові 2–90 сек при ~16 кб/сек
+        n_bytes = int(rng.uniform(2, 90) * 16000)
+        result = analyze_voice_bytes(bytes(n_bytes), "audio/ogg")
+        pool.append((float(result["stress_score"]), result["level"], json.dumps(result, ensure_ascii=False)))
+    return pool
+
+
+def _count(rng: random.Random, avg: float) -> int:
+    if avg <= 0:
+        return 0
+    return int(rng.expovariate(1.0 / avg) + 0.5)
+
+
+def generate_rows(
+    rng: random.Random,
+    first_id: int,
+    n_candidates: int,
+    until: datetime.datetime,
+    days: int,
+    tests_avg: float,
+    voices_avg: float,
+    photos_avg: float,
+    weights: Dict[str, float],
+    test_pools: Dict[str, List[Tuple[str, str, str, str, str]]],
+    voice_pool: List[Tuple[float, str, str]],
+) -> Iterator[Tuple[str, tuple]]:
+    """Потік (table, row) у хронологічному порядку всередині кандидата."""
+    codes = list(weights.keys())
+    code_weights = [weights[c] for c in codes]
+    span = days * 86400.0
+
+    for cid in range(first_id, first_id + n_candidates):
+        created = until - datetime.timedelta(seconds=rng.uniform(0, span))
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        yield "candidates", (cid, TG_ID_BASE + cid, name, created.isoformat())
+
+        left = max(1.0, (until - created).total_seconds())
+
+        def ts() -> str:
+            return (created + datetime.timedelta(seconds=rng.uniform(0, left))).isoformat()
+
+        for _ in range(_count(rng, tests_avg)):
+            code = rng.choices(codes, code_weights)[0]
+            answers, scores, summary, recs, risk = rng.choice(test_pools[code])
+            now = ts()
+            yield "test_results", (cid, code, answers, scores, now)
+            yield "ai_reports", (cid, code, summary, recs, risk, now)
+
+        for _ in range(_count(rng, voices_avg)):
+            stress, level, details = rng.choice(voice_pool)
+            yield "voice_results", (cid, stress, level, details, ts())
+
+        for _ in range(_count(rng, photos_avg)):
+            brightness = min(255.0, max(0.0, rng.gauss(135, 40)))
+            contrast = min(128.0, max(0.0, rng.gauss(45, 15)))
+            p = photo_metrics(brightness, contrast)
+            yield "photo_results", (
+                cid, p["mood"], p["fatigue_level"], p["brightness"], p["contrast"], ts(),
+            )
+
+
+INSERT_SQL = {
+    "candidates": "INSERT INTO candidates (id, tg_id, full_name, created_at) VALUES (?, ?, ?, ?)",
+    "test_results": (
+        "INSERT INTO test_results (candidate_id, test_type, raw_answers, scores_json, created_at) "
+        "VALUES (?, ?, ?, ?, ?)"
+    ),
+    "ai_reports": (
+        "INSERT INTO ai_reports (candidate_id, test_type, summary, recommendations, risk_level, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)"
+    ),
+    "voice_results": (
+        "INSERT INTO voice_results (candidate_id, stress_score, level, details_json, created_at) "
+        "VALUES (?, ?, ?, ?, ?)"
+    ),
+    "photo_results": (
+        "INSERT INTO photo_results (candidate_id, mood, fatigue_level, brightness, contrast, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)"
+    ),
+}
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Synthetic data generator for hrpsy SQLite schema")
+    ap.add_argument("--db", type=Path, required=True, help="target SQLite file (schema is created if missing)")
+    ap.add_argument("--candidates", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--days", type=int, default=365, help="spread created_at over this many days")
+    ap.add_argument("--until", default=None, help="ISO date of the newest row (default: today 00:00 UTC)")
+    ap.add_argument("--tests-avg", type=float, default=4.0, help="mean test results per candidate")
+    ap.add_argument("--voices-avg", type=float, default=1.5, help="mean voice results per candidate")
+    ap.add_argument("--photos-avg", type=float, default=1.5, help="mean photo results per candidate")
+    ap.add_argument("--test-weights", default="", help="e.g. bigfive=3,mbti=1,eq=1")
+    ap.add_argument("--questions-per-trait", type=int, default=5)
+    ap.add_argument("--pool-size", type=int, default=2048, help="distinct answer sets per test type")
+    args = ap.parse_args(argv)
+
+    if args.until:
+        until = datetime.datetime.fromisoformat(args.until)
+    else:
+        until = datetime.datetime.combine(datetime.datetime.utcnow().date(), datetime.time())
+
+    rng = random.Random(args.seed)
+    weights = parse_weights(args.test_weights)
+    test_pools = {
+        code: build_test_pool(rng, code, args.questions_per_trait, args.pool_size) for code in weights
+    }
+    voice_pool = build_voice_pool(rng, 256)
+
+    init_db(args.db)
+    conn = get_conn(args.db)
+    for pragma in LOAD_PRAGMAS:
+        conn.execute(pragma)
+
+    first_id = (conn.execute("SELECT MAX(id) FROM candidates").fetchone()[0] or 0) + 1
+    buffers: Dict[str, List[tuple]] = {table: [] for table in INSERT_SQL}
+    totals: Dict[str, int] = {table: 0 for table in INSERT_SQL}
+
+    def flush():
+        for table, rows in buffers.items():
+            if rows:
+                conn.executemany(INSERT_SQL[table], rows)
+                totals[table] += len(rows)
+                rows.clear()
+        conn.commit()
+
+    started = time.perf_counter()
+    pending = 0
+    conn.execute("BEGIN")
+    for table, row in generate_rows(
+        rng, first_id, args.candidates, until, args.days,
+        args.tests_avg, args.voices_avg, args.photos_avg,
+        weights, test_pools, voice_pool,
+    ):
+        buffers[table].append(row)
+        pending += 1
+        if pending >= BATCH_SIZE:
+            flush()
+            conn.execute("BEGIN")
+            pending = 0
+    flush()
+
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+
+    elapsed = time.perf_counter() - started
+    total = sum(totals.values())
+    for table, n in totals.items():
+        print(f"{table:15s} {n:>12,d}")
+    print(f"{'total':15s} {total:>12,d} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
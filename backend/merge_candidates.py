@@ -0,0 +1,156 @@
+"""
+Одноразове злиття дублікатів кандидатів за tg_id
+------------------------------------------------
+До ідемпотентного start_test кожен /start бота створював нового кандидата.
+Скрипт зливає дублікати в найстарший запис (мінімальний id):
+
++ результати (test_results, ai_reports, voice_results, photo_results)
+  переносяться на канонічний id — і в гарячій БД, і в архівних файлах
++ мапа old_id -> new_id зберігається в candidate_merges
++ злиття йде пачками по --batch-size tg_id на транзакцію, щоб не тримати
+  write-lock надовго; після останньої пачки створюється UNIQUE-індекс
+
+    python merge_candidates.py [--db path] [--all-shards] [--batch-size 500]
+"""
+
+import argparse
+import datetime
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from archive import RESULT_TABLES
+
+
+def _merge_batch(conn, batch_size: int) -> int:
+    conn.execute("DELETE FROM temp._merge")
+    conn.execute(
+        """
+        INSERT INTO temp._merge (old_id, new_id)
+        SELECT c.id, k.keep_id
+        FROM candidates c
+        JOIN (
+            SELECT tg_id, MIN(id) AS keep_id
+            FROM candidates
+            WHERE tg_id IS NOT NULL
+            GROUP BY tg_id
+            HAVING COUNT(*) > 1
+            LIMIT ?
+        ) k ON k.tg_id = c.tg_id
+        WHERE c.id != k.keep_id
+        """,
+        (batch_size,),
+    )
+    n = conn.execute("SELECT COUNT(*) FROM temp._merge").fetchone()[0]
+    if not n:
+        conn.commit()
+        return 0
+
+    for table in RESULT_TABLES:
+        conn.execute(
+            f"""
+            UPDATE {table}
+            SET candidate_id = (SELECT new_id FROM temp._merge WHERE old_id = {table}.candidate_id)
+            WHERE candidate_id IN (SELECT old_id FROM temp._merge)
+            """
+        )
+
+    # канонічний запис бере останнє непорожнє ім'я з групи
+    conn.execute(
+        """
+        UPDATE candidates
+        SET full_name = (
+            SELECT c.full_name FROM candidates c
+            WHERE c.tg_id = candidates.tg_id AND c.full_name != ''
+            ORDER BY c.id DESC LIMIT 1
+        )
+        WHERE id IN (SELECT new_id FROM temp._merge)
+          AND EXISTS (
+            SELECT 1 FROM candidates c
+            WHERE c.tg_id = candidates.tg_id AND c.full_name != ''
+          )
+        """
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO candidate_merges (old_id, new_id, merged_at) SELECT old_id, new_id, ? FROM temp._merge",
+        (datetime.datetime.utcnow().isoformat(),),
+    )
+    conn.execute("DELETE FROM candidates WHERE id IN (SELECT old_id FROM temp._merge)")
+    conn.commit()
+    return n
+
+
+def _remap_archives(conn) -> int:
+    """Переносить архівні результати злитих кандидатів на канонічні id."""
+    updated = 0
+    for (path,) in conn.execute("SELECT path FROM archive_periods").fetchall():
+        if not Path(path).exists():
+            continue
+        conn.execute("ATTACH DATABASE ? AS arch", (path,))
+        try:
+            for table in RESULT_TABLES:
+                cur = conn.execute(
+                    f"""
+                    UPDATE arch.{table}
+                    SET candidate_id = (SELECT new_id FROM main.candidate_merges WHERE old_id = arch.{table}.candidate_id)
+                    WHERE candidate_id IN (SELECT old_id FROM main.candidate_merges)
+                    """
+                )
+                updated += cur.rowcount
+            conn.commit()
+        finally:
+            conn.execute("DETACH DATABASE arch")
+    return updated
+
+
+def merge_duplicates(db_path: Path, batch_size: int = 500, pause: float = 0.0) -> dict:
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_tg_id ON candidates (tg_id)")
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS _merge (old_id INTEGER PRIMARY KEY, new_id INTEGER)")
+
+        merged = 0
+        batches = 0
+        while True:
+            n = _merge_batch(conn, batch_size)
+            if not n:
+                break
+            merged += n
+            batches += 1
+            if pause:
+                # даємо іншим писачам забрати lock між пачками
+                time.sleep(pause)
+
+        archived = _remap_archives(conn)
+
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_candidates_tg_id ON candidates (tg_id)")
+        conn.execute("DROP INDEX IF EXISTS idx_candidates_tg_id")
+        conn.commit()
+    finally:
+        conn.close()
+    return {"merged": merged, "batches": batches, "archived_rows": archived}
+
+
+def main(argv: Optional[List[str]] = None):
+    from app import DB_PATH, ensure_db, shard_router
+
+    ap = argparse.ArgumentParser(description="Merge duplicate candidates by tg_id")
+    ap.add_argument("--db", type=Path, default=DB_PATH)
+    ap.add_argument("--all-shards", action="store_true", help="run for every tenant shard")
+    ap.add_argument("--batch-size", type=int, default=500, help="tg_id groups per transaction")
+    ap.add_argument("--pause", type=float, default=0.05, help="seconds to sleep between batches")
+    args = ap.parse_args(argv)
+
+    paths = [t.db_path for t in shard_router.list_tenants()] if args.all_shards else [args.db]
+    for path in paths:
+        ensure_db(path)
+        report = merge_duplicates(path, args.batch_size, args.pause)
+        print(
+            f"{path}: merged {report['merged']} duplicates in {report['batches']} batches, "
+            f"{report['archived_rows']} archived rows remapped"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Матеріалізований HR-огляд (dashboard)
+-------------------------------------
+Зведені таблиці з агрегатами по днях і тижнях (тиждень = дата понеділка):
+
++ stats_candidates — нові кандидати
++ stats_risk       — розподіл risk_level по test_type (з ai_reports)
++ stats_voice      — кількість та сума stress_score
++ stats_photo      — кількість, сума fatigue (низький=1 .. високий=3) та brightness
+
+Оновлюються інкрементально тригерами AFTER INSERT, тож працюють для будь-якого
+писача (ендпоінти, write-behind, gen_synthetic). Архівація результатів агрегати
+не змінює — це історія, а rebuild() (і backfill) читає й архівні файли з
+archive_periods; злиття дублікатів кандидатів (DELETE) їх віднімає.
+/api/hr/overview читає лише ці маленькі таблиці.
+"""
+
+import datetime
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List
+
+GRAINS = {
+    "day": "substr({ts}, 1, 10)",
+    "week": "date({ts}, 'weekday 0', '-6 days')",
+}
+
+FATIGUE_SCORE = "CASE {col} WHEN 'низький' THEN 1 WHEN 'середній' THEN 2 WHEN 'високий' THEN 3 END"
+
+TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS stats_candidates (
+        grain TEXT, period TEXT, n INTEGER,
+        PRIMARY KEY (grain, period)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_risk (
+        grain TEXT, period TEXT, test_type TEXT, risk_level TEXT, n INTEGER,
+        PRIMARY KEY (grain, period, test_type, risk_level)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_voice (
+        grain TEXT, period TEXT, n INTEGER, stress_sum REAL,
+        PRIMARY KEY (grain, period)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_photo (
+        grain TEXT, period TEXT, n INTEGER, fatigue_n INTEGER, fatigue_sum REAL, brightness_sum REAL,
+        PRIMARY KEY (grain, period)
+    )
+    """,
+]
+
+
+def _upserts(ts: str, sign: str = "+") -> Dict[str, str]:
+    """UPSERT-и для одного рядка (NEW/OLD) по всіх grain-ах, згруповані за таблицею."""
+    out: Dict[str, List[str]] = {"candidates": [], "risk": [], "voice": [], "photo": []}
+    for grain, expr in GRAINS.items():
+        period = expr.format(ts=f"{ts}.created_at")
+        out["candidates"].append(
+            f"""
+            INSERT INTO stats_candidates (grain, period, n) VALUES ('{grain}', {period}, {sign}1)
+            ON CONFLICT (grain, period) DO UPDATE SET n = n + excluded.n;
+            """
+        )
+        out["risk"].append(
+            f"""
+            INSERT INTO stats_risk (grain, period, test_type, risk_level, n)
+            VALUES ('{grain}', {period}, {ts}.test_type, {ts}.risk_level, 1)
+            ON CONFLICT (grain, period, test_type, risk_level) DO UPDATE SET n = n + 1;
+            """
+        )
+        out["voice"].append(
+            f"""
+            INSERT INTO stats_voice (grain, period, n, stress_sum)
+            VALUES ('{grain}', {period}, 1, COALESCE({ts}.stress_score, 0))
+            ON CONFLICT (grain, period) DO UPDATE SET
+                n = n + 1, stress_sum = stress_sum + excluded.stress_sum;
+            """
+        )
+        fatigue = FATIGUE_SCORE.format(col=f"{ts}.fatigue_level")
+        out["photo"].append(
+            f"""
+            INSERT INTO stats_photo (grain, period, n, fatigue_n, fatigue_sum, brightness_sum)
+            VALUES ('{grain}', {period}, 1, ({fatigue}) IS NOT NULL, COALESCE({fatigue}, 0),
+                    COALESCE({ts}.brightness, 0))
+            ON CONFLICT (grain, period) DO UPDATE SET
+                n = n + 1,
+                fatigue_n = fatigue_n + excluded.fatigue_n,
+                fatigue_sum = fatigue_sum + excluded.fatigue_sum,
+                brightness_sum = brightness_sum + excluded.brightness_sum;
+            """
+        )
+    return {k: "".join(v) for k, v in out.items()}
+
+
+def install(c):
+    """Створює зведені таблиці та тригери; при першому встановленні — backfill."""
+    c.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'stats_candidates'")
+    fresh = c.fetchone() is None
+
+    for ddl in TABLES:
+        c.execute(ddl)
+
+    new = _upserts("NEW")
+    old = _upserts("OLD", sign="-")
+    triggers = {
+        "trg_stats_candidates_ins": ("AFTER INSERT ON candidates", new["candidates"]),
+        "trg_stats_candidates_del": ("AFTER DELETE ON candidates", old["candidates"]),
+        "trg_stats_risk_ins": ("AFTER INSERT ON ai_reports", new["risk"]),
+        "trg_stats_voice_ins": ("AFTER INSERT ON voice_results", new["voice"]),
+        "trg_stats_photo_ins": ("AFTER INSERT ON photo_results", new["photo"]),
+    }
+    for name, (event, body) in triggers.items():
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+
+    if fresh:
+        rebuild(c)
+
+
+# агрегати результатів: (SELECT по одному файлу, UPSERT з додаванням у зведену таблицю)
+RESULT_AGGREGATES = [
+    (
+        """
+        SELECT '{grain}', {period} AS p, test_type, risk_level, COUNT(*)
+        FROM ai_reports GROUP BY p, test_type, risk_level
+        """,
+        """
+        INSERT INTO stats_risk (grain, period, test_type, risk_level, n) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (grain, period, test_type, risk_level) DO UPDATE SET n = n + excluded.n
+        """,
+    ),
+    (
+        """
+        SELECT '{grain}', {period} AS p, COUNT(*), TOTAL(stress_score)
+        FROM voice_results GROUP BY p
+        """,
+        """
+        INSERT INTO stats_voice (grain, period, n, stress_sum) VALUES (?, ?, ?, ?)
+        ON CONFLICT (grain, period) DO UPDATE SET
+            n = n + excluded.n, stress_sum = stress_sum + excluded.stress_sum
+        """,
+    ),
+    (
+        """
+        SELECT '{grain}', {period} AS p, COUNT(*), COUNT({fatigue}), TOTAL({fatigue}), TOTAL(brightness)
+        FROM photo_results GROUP BY p
+        """,
+        """
+        INSERT INTO stats_photo (grain, period, n, fatigue_n, fatigue_sum, brightness_sum) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (grain, period) DO UPDATE SET
+            n = n + excluded.n,
+            fatigue_n = fatigue_n + excluded.fatigue_n,
+            fatigue_sum = fatigue_sum + excluded.fatigue_sum,
+            brightness_sum = brightness_sum + excluded.brightness_sum
+        """,
+    ),
+]
+
+
+def _archive_paths(c) -> List[str]:
+    try:
+        rows = c.execute("SELECT path FROM archive_periods ORDER BY period_start").fetchall()
+    except sqlite3.OperationalError:
+        # стара схема без archive_periods — архівів ще не було
+        return []
+    return [path for (path,) in rows if Path(path).exists()]
+
+
+def rebuild(c):
+    """Повний перерахунок агрегатів з гарячих таблиць і архівних файлів (для backfill / перевірки).
+
+    Архіви читаються окремим read-only з'єднанням по одному файлу (без ATTACH,
+    тож перерахунок лишається в одній транзакції викликача).
+    """
+    for table in ("stats_candidates", "stats_risk", "stats_voice", "stats_photo"):
+        c.execute(f"DELETE FROM {table}")
+
+    sources = [None] + _archive_paths(c)
+    for path in sources:
+        src = c if path is None else sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            for grain, expr in GRAINS.items():
+                period = expr.format(ts="created_at")
+                fatigue = FATIGUE_SCORE.format(col="fatigue_level")
+                if path is None:
+                    # кандидати не архівуються
+                    c.execute(
+                        f"""
+                        INSERT INTO stats_candidates (grain, period, n)
+                        SELECT '{grain}', {period} AS p, COUNT(*) FROM candidates GROUP BY p
+                        """
+                    )
+                for select, upsert in RESULT_AGGREGATES:
+                    try:
+                        rows = src.execute(select.format(grain=grain, period=period, fatigue=fatigue)).fetchall()
+                    except sqlite3.OperationalError:
+                        # архів без цієї таблиці
+                        if path is None:
+                            raise
+                        continue
+                    c.executemany(upsert, rows)
+        finally:
+            if path is not None:
+                src.close()
+
+
+def _avg(total, n):
+    return round(total / n, 2) if n else None
+
+
+def read_overview(conn, days: int = 14, weeks: int = 8) -> Dict[str, Any]:
+    today = datetime.datetime.utcnow().date()
+    day_from = (today - datetime.timedelta(days=days - 1)).isoformat()
+    this_week = today - datetime.timedelta(days=today.weekday())
+    week_from = (this_week - datetime.timedelta(weeks=weeks - 1)).isoformat()
+
+    def series(grain: str, since: str) -> List[Dict[str, Any]]:
+        rows: Dict[str, Dict[str, Any]] = {}
+
+        def bucket(period):
+            return rows.setdefault(period, {
+                "period": period, "candidates": 0, "tests": 0,
+                "voice_count": 0, "avg_stress": None,
+                "photo_count": 0, "avg_fatigue": None, "avg_brightness": None,
+            })
+
+        for period, n in conn.execute(
+            "SELECT period, n FROM stats_candidates WHERE grain = ? AND period >= ?", (grain, since)
+        ):
+            bucket(period)["candidates"] = n
+        for period, n in conn.execute(
+            "SELECT period, SUM(n) FROM stats_risk WHERE grain = ? AND period >= ? GROUP BY period", (grain, since)
+        ):
+            bucket(period)["tests"] = n
+        for period, n, stress in conn.execute(
+            "SELECT period, n, stress_sum FROM stats_voice WHERE grain = ? AND period >= ?", (grain, since)
+        ):
+            b = bucket(period)
+            b["voice_count"], b["avg_stress"] = n, _avg(stress, n)
+        for period, n, fn, fsum, bsum in conn.execute(
+            "SELECT period, n, fatigue_n, fatigue_sum, brightness_sum FROM stats_photo WHERE grain = ? AND period >= ?",
+            (grain, since),
+        ):
+            b = bucket(period)
+            b["photo_count"], b["avg_fatigue"], b["avg_brightness"] = n, _avg(fsum, fn), _avg(bsum, n)
+        return [rows[p] for p in sorted(rows)]
+
+    risk: Dict[str, Dict[str, int]] = {}
+    for test_type, risk_level, n in conn.execute(
+        """
+        SELECT test_type, risk_level, SUM(n) FROM stats_risk
+        WHERE grain = 'week' AND period >= ?
+        GROUP BY test_type, risk_level
+        """,
+        (week_from,),
+    ):
+        risk.setdefault(test_type, {})[risk_level] = n
+
+    voice_n, stress = conn.execute(
+        "SELECT TOTAL(n), TOTAL(stress_sum) FROM stats_voice WHERE grain = 'week' AND period >= ?", (week_from,)
+    ).fetchone()
+    fatigue_n, fatigue = conn.execute(
+        "SELECT TOTAL(fatigue_n), TOTAL(fatigue_sum) FROM stats_photo WHERE grain = 'week' AND period >= ?",
+        (week_from,),
+    ).fetchone()
+    week_row = conn.execute(
+        "SELECT n FROM stats_candidates WHERE grain = 'week' AND period = ?", (this_week.isoformat(),)
+    ).fetchone()
+
+    return {
+        "candidates_this_week": week_row[0] if week_row else 0,
+        "window_weeks": weeks,
+        "risk_by_test": risk,
+        "avg_stress": _avg(stress, voice_n),
+        # 1 = низький, 2 = середній, 3 = високий
+        "avg_fatigue": _avg(fatigue, fatigue_n),
+        "days": series("day", day_from),
+        "weeks": series("week", week_from),
+    }
@@ -0,0 +1,290 @@
+"""
+Per-tenant шардинг SQLite
+-------------------------
+Кожна компанія-клієнт (tenant) має власний SQLite-файл зі своєю схемою
+та власним рядком hr_billing, тож важкий імпорт одного клієнта не тримає
+write-lock для інших.
+
++ tenant визначається за X-Admin-Key (у реєстрі зберігається лише sha256 ключа);
+  ендпоінти кандидата (бот) можуть передати X-Tenant-Id; невідомий id -> 404,
+  default використовується лише без обох заголовків
++ ADMIN_API_KEY + основний DB_PATH — tenant "default" (зворотна сумісність)
++ ShardRouter тримає пул з'єднань на кожен шард; get_conn() в app.py
+  бере з'єднання шарду поточного запиту (contextvar від TenantMiddleware)
+
+Інструменти:
+    python shards.py create acme <admin-key>
+    python shards.py list
+    python shards.py migrate        # ensure_db() для всіх шардів
+"""
+
+import contextvars
+import datetime
+import hashlib
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from starlette.responses import JSONResponse
+
+from archive import ARCHIVE_ROWS_PREFIX
+
+DEFAULT_TENANT_ID = "default"
+
+
+class Tenant(NamedTuple):
+    tenant_id: str
+    db_path: Path
+
+
+current_tenant: "contextvars.ContextVar[Optional[Tenant]]" = contextvars.ContextVar(
+    "current_tenant", default=None
+)
+
+
+def _key_hash(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3.Connection, у якого close() повертає з'єднання в пул."""
+
+    _pool: Optional["ConnectionPool"] = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.release(self)
+        else:
+            super().close()
+
+    def really_close(self):
+        self._pool = None
+        super().close()
+
+    def reset(self):
+        if self.in_transaction:
+            self.rollback()
+        # прибираємо TEMP VIEW / TEMP-таблиці та ATTACH від archive.attach_archives()
+        for kind, name in self.execute(
+            "SELECT type, name FROM temp.sqlite_master WHERE type = 'view' OR (type = 'table' AND name LIKE ?)",
+            (ARCHIVE_ROWS_PREFIX + "%",),
+        ).fetchall():
+            self.execute(f"DROP {kind.upper()} temp.{name}")
+        attached = [r[1] for r in self.execute("PRAGMA database_list") if r[1] not in ("main", "temp")]
+        for name in attached:
+            self.execute(f"DETACH DATABASE {name}")
+
+
+class ConnectionPool:
+    def __init__(self, db_path: Path, max_idle: int = 8):
+        self.db_path = db_path
+        self._max_idle = max_idle
+        self._idle: List[PooledConnection] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> PooledConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        conn = sqlite3.connect(self.db_path, factory=PooledConnection, check_same_thread=False)
+        conn._pool = self
+        return conn
+
+    def release(self, conn: PooledConnection):
+        try:
+            conn.reset()
+        except sqlite3.Error:
+            conn.really_close()
+            return
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append(conn)
+                return
+        conn.really_close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.really_close()
+
+
+class ShardRouter:
+    def __init__(
+        self,
+        default_key: str,
+        default_db: Path,
+        registry_path: Path,
+        shards_dir: Path,
+        init_shard: Callable[[Path], None],
+    ):
+        self.default = Tenant(DEFAULT_TENANT_ID, default_db)
+        self._default_key_hash = _key_hash(default_key)
+        self.registry_path = registry_path
+        self.shards_dir = shards_dir
+        self._init_shard = init_shard
+        self._by_key: Dict[str, Tenant] = {}
+        self._by_id: Dict[str, Tenant] = {}
+        self._pools: Dict[str, ConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    # --- реєстр ---
+
+    def _registry(self):
+        conn = sqlite3.connect(self.registry_path)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tenants (
+                tenant_id TEXT PRIMARY KEY,
+                key_hash TEXT UNIQUE,
+                db_path TEXT,
+                created_at TEXT
+            )
+            """
+        )
+        return conn
+
+    def _lookup(self, column: str, value: str) -> Optional[Tenant]:
+        if not self.registry_path.exists():
+            return None
+        conn = self._registry()
+        try:
+            row = conn.execute(
+                f"SELECT tenant_id, key_hash, db_path FROM tenants WHERE {column} = ?", (value,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        tenant = Tenant(row[0], Path(row[2]))
+        with self._lock:
+            self._by_key[row[1]] = tenant
+            self._by_id[tenant.tenant_id] = tenant
+        return tenant
+
+    def tenant_for_key(self, api_key: Optional[str]) -> Optional[Tenant]:
+        if not api_key:
+            return None
+        h = _key_hash(api_key)
+        if h == self._default_key_hash:
+            return self.default
+        return self._by_key.get(h) or self._lookup("key_hash", h)
+
+    def tenant_by_id(self, tenant_id: str) -> Optional[Tenant]:
+        if tenant_id == DEFAULT_TENANT_ID:
+            return self.default
+        return self._by_id.get(tenant_id) or self._lookup("tenant_id", tenant_id)
+
+    def create_tenant(self, tenant_id: str, api_key: str) -> Tenant:
+        if tenant_id == DEFAULT_TENANT_ID or not tenant_id.replace("-", "").replace("_", "").isalnum():
+            raise ValueError(f"Invalid tenant id: {tenant_id!r}")
+        db_path = (self.shards_dir / tenant_id / "hrpsy.db").resolve()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_shard(db_path)
+        conn = self._registry()
+        try:
+            conn.execute(
+                "INSERT INTO tenants (tenant_id, key_hash, db_path, created_at) VALUES (?, ?, ?, ?)",
+                (tenant_id, _key_hash(api_key), str(db_path), datetime.datetime.utcnow().isoformat()),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        return Tenant(tenant_id, db_path)
+
+    def list_tenants(self) -> List[Tenant]:
+        tenants = [self.default]
+        if self.registry_path.exists():
+            conn = self._registry()
+            try:
+                rows = conn.execute("SELECT tenant_id, db_path FROM tenants ORDER BY tenant_id").fetchall()
+            finally:
+                conn.close()
+            tenants += [Tenant(r[0], Path(r[1])) for r in rows]
+        return tenants
+
+    # --- маршрутизація з'єднань ---
+
+    def pool(self, tenant: Optional[Tenant] = None) -> ConnectionPool:
+        tenant = tenant or current_tenant.get() or self.default
+        pool = self._pools.get(tenant.tenant_id)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(tenant.tenant_id)
+                if pool is None:
+                    # схема шарду перевіряється один раз на процес
+                    self._init_shard(tenant.db_path)
+                    pool = self._pools[tenant.tenant_id] = ConnectionPool(tenant.db_path)
+        return pool
+
+    def connect(self, tenant: Optional[Tenant] = None) -> PooledConnection:
+        return self.pool(tenant).acquire()
+
+    def close_all(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close_all()
+
+
+class TenantMiddleware:
+    """Визначає tenant запиту за X-Admin-Key або X-Tenant-Id і кладе його в contextvar."""
+
+    def __init__(self, app, router: ShardRouter):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        tenant = None
+        admin_key = headers.get(b"x-admin-key")
+        if admin_key:
+            tenant = self.router.tenant_for_key(admin_key.decode("latin-1"))
+        tenant_id = headers.get(b"x-tenant-id")
+        if tenant is None and tenant_id:
+            tenant = self.router.tenant_by_id(tenant_id.decode("latin-1"))
+            if tenant is None:
+                # не підміняємо шард default-ом: опечатка в id змішала б дані клієнтів
+                response = JSONResponse(
+                    status_code=404, content={"detail": f"Unknown tenant: {tenant_id.decode('latin-1')}"}
+                )
+                await response(scope, receive, send)
+                return
+
+        token = current_tenant.set(tenant or self.router.default)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
+
+
+def main(argv: List[str]):
+    from app import ensure_db, shard_router
+
+    if not argv or argv[0] not in ("create", "list", "migrate"):
+        print(__doc__)
+        raise SystemExit(2)
+
+    cmd = argv[0]
+    if cmd == "create":
+        if len(argv) != 3:
+            raise SystemExit("usage: python shards.py create <tenant_id> <admin_key>")
+        tenant = shard_router.create_tenant(argv[1], argv[2])
+        print(f"created {tenant.tenant_id}: {tenant.db_path}")
+    elif cmd == "list":
+        for tenant in shard_router.list_tenants():
+            print(f"{tenant.tenant_id:20s} {tenant.db_path}")
+    elif cmd == "migrate":
+        for tenant in shard_router.list_tenants():
+            ensure_db(tenant.db_path)
+            print(f"migrated {tenant.tenant_id}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
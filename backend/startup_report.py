@@ -0,0 +1,100 @@
+"""
+Звіт про вартість старту воркера
+--------------------------------
+Вимірює в чистому підпроцесі час `import app`, RSS після імпорту та які
+важкі модулі вже завантажені. Потім "прогріває" лениві підсистеми
+(фото, голос, PDF) і показує, скільки кожна додає.
+
+    python startup_report.py          # таблиця
+    python startup_report.py --json   # для CI / трекінгу регресій
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+HEAVY_MODULES = ["PIL", "reportlab", "numpy", "scipy", "cv2", "matplotlib"]
+
+LAZY_SUBSYSTEMS = [
+    ("photo", "ai.photo", "from PIL import Image, ImageStat"),
+    ("voice", "ai.voice", ""),
+    ("pdf", "ai.reports", ""),
+]
+
+
+def rss_kb() -> int:
+    """Поточний RSS процесу в KB (Linux /proc, інакше пік через resource)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS повертає байти, Linux — KB
+        return peak // 1024 if sys.platform == "darwin" else peak
+    except ImportError:
+        return 0
+
+
+_PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+from startup_report import rss_kb, HEAVY_MODULES, LAZY_SUBSYSTEMS
+out = {
+    "import_ms": round((t1 - t0) * 1000, 1),
+    "rss_mb": round(rss_kb() / 1024, 1),
+    "heavy_loaded": [m for m in HEAVY_MODULES if m in sys.modules],
+    "lazy": {},
+}
+import importlib
+for name, module, extra in LAZY_SUBSYSTEMS:
+    before = rss_kb()
+    s = time.perf_counter()
+    importlib.import_module(module)
+    if extra:
+        exec(extra)
+    out["lazy"][name] = {
+        "ms": round((time.perf_counter() - s) * 1000, 1),
+        "rss_delta_mb": round((rss_kb() - before) / 1024, 1),
+    }
+out["rss_after_warmup_mb"] = round(rss_kb() / 1024, 1)
+print(json.dumps(out))
+"""
+
+
+def measure() -> Dict:
+    here = Path(__file__).resolve().parent
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=here,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv: List[str]):
+    report = measure()
+    if "--json" in argv:
+        print(json.dumps(report, ensure_ascii=False))
+        return
+
+    print(f"import app        {report['import_ms']:>8.1f} ms   rss {report['rss_mb']:>7.1f} MB")
+    print(f"heavy at import   {', '.join(report['heavy_loaded']) or '-'}")
+    for name, m in report["lazy"].items():
+        print(f"  + {name:14s} {m['ms']:>8.1f} ms   rss +{m['rss_delta_mb']:.1f} MB")
+    print(f"after warm-up                  rss {report['rss_after_warmup_mb']:>7.1f} MB")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,89 @@
+"""
+Обробка завантажень з обмеженням розміру
+----------------------------------------
++ UploadLimitMiddleware рахує байти тіла запиту ще до розбору multipart
+  і відповідає 413, щойно ліміт для типу перевищено (або одразу за Content-Length)
++ spool_upload() проходить файл частинами (sha256 + розмір) і повертає
+  той самий SpooledTemporaryFile, який вже створив Starlette: у пам'яті
+  тримається не більше ~1 МБ на завантаження, решта — на диску, без копій bytes
+"""
+
+import hashlib
+import os
+from typing import BinaryIO, Dict, NamedTuple
+
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# запас на multipart-заголовки та поле candidate_id
+MULTIPART_OVERHEAD = 16 * 1024
+
+UPLOAD_LIMITS: Dict[str, int] = {
+    "voice": int(os.getenv("VOICE_MAX_BYTES", str(20 * 1024 * 1024))),
+    "photo": int(os.getenv("PHOTO_MAX_BYTES", str(10 * 1024 * 1024))),
+    "video": int(os.getenv("VIDEO_MAX_BYTES", str(50 * 1024 * 1024))),
+}
+
+
+class SpooledUpload(NamedTuple):
+    file: BinaryIO
+    digest: str
+    size: int
+
+
+def _too_large_detail(kind: str) -> str:
+    return f"File too large (max {UPLOAD_LIMITS[kind]} bytes for {kind})"
+
+
+class UploadLimitMiddleware:
+    """ASGI-middleware: рве завантаження, що перевищують ліміт свого типу."""
+
+    def __init__(self, app, routes: Dict[str, str]):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        kind = self.routes.get(scope.get("path", "")) if scope["type"] == "http" else None
+        if kind is None:
+            await self.app(scope, receive, send)
+            return
+
+        limit = UPLOAD_LIMITS[kind] + MULTIPART_OVERHEAD
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                response = JSONResponse(status_code=413, content={"detail": _too_large_detail(kind)})
+                await response(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI пропускає HTTPException з розбору тіла як є -> 413
+                    raise HTTPException(status_code=413, detail=_too_large_detail(kind))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def spool_upload(file: UploadFile, kind: str) -> SpooledUpload:
+    """Хешує та міряє завантаження частинами; повертає файл, перемотаний на початок."""
+    limit = UPLOAD_LIMITS[kind]
+    h = hashlib.sha256()
+    size = 0
+    await file.seek(0)
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail=_too_large_detail(kind))
+        h.update(chunk)
+    await file.seek(0)
+    return SpooledUpload(file=file.file, digest=h.hexdigest(), size=size)